@@ -0,0 +1,260 @@
+"""
+ASGI Entry Point
+================
+
+Serves the app on an event loop so one worker can hold thousands of slow
+connections:
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+The tracking and form endpoints are handled natively: request bodies are
+read asynchronously and the JSON file updates run on a small storage thread
+pool, so a slow client never ties up a thread. Admission control
+(app.admission) sheds excess tracking requests before their body is read. Every other route is passed
+to the Flask app through a thread-pooled WSGI adapter. The geodata refresh
+uses a pooled async HTTP client instead of blocking an executor thread.
+"""
+
+import json
+import time
+import asyncio
+import functools
+
+import httpx
+from a2wsgi import WSGIMiddleware
+
+import app as site
+from helpers import metrics
+
+
+# Threads for the Flask routes that are not handled natively (map renders,
+# AI calls, the page itself) and for JSON file reads/writes.
+WSGI_THREADS = 32
+STORAGE_THREADS = 8
+MAX_BODY_BYTES = 1024 * 1024
+
+# Outbound connections kept open by the async HTTP client.
+HTTP_MAX_CONNECTIONS = 20
+HTTP_KEEPALIVE_CONNECTIONS = 10
+
+wsgi = WSGIMiddleware(site.app, workers=WSGI_THREADS)
+storage = metrics.InstrumentedExecutor(max_workers=STORAGE_THREADS, name="storage")
+
+_state = {}
+
+
+class BadRequest(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ==========================================================================
+# HTTP Helpers
+# ==========================================================================
+
+async def run_storage(fn, *args):
+    """Run a blocking storage call on the storage pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(storage, functools.partial(fn, *args))
+
+
+async def read_json_body(receive):
+    """
+    Read the request body without blocking and parse it as JSON.
+
+    Raises:
+        BadRequest: If the body is too large or not a JSON object
+    """
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise BadRequest(400, "Client disconnected")
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise BadRequest(413, "Request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            break
+    try:
+        data = json.loads(b"".join(chunks) or b"null")
+    except ValueError:
+        raise BadRequest(400, "Invalid JSON body")
+    if not isinstance(data, dict):
+        raise BadRequest(400, "Expected a JSON object")
+    return data
+
+
+async def send_json(send, payload, status=200, headers=None):
+    body = json.dumps(payload).encode("utf-8")
+    extra = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in (headers or {}).items()]
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())] + extra,
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def client_ip(scope):
+    """Same rule as app.get_client_ip: X-Forwarded-For, else the peer address."""
+    for name, value in scope.get("headers", []):
+        if name == b"x-forwarded-for":
+            return value.decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+# ==========================================================================
+# Native Handlers
+# ==========================================================================
+
+async def tab_click(scope, receive, send):
+    data = await read_json_body(receive)
+    tab_id = data.get("tab_id")
+    if not tab_id:
+        return await send_json(send, {"error": "No tab_id provided"}, 400)
+    if not isinstance(tab_id, str):
+        return await send_json(send, {"error": "tab_id must be a string"}, 400)
+    count = await run_storage(site.record_tab_click, tab_id, client_ip(scope))
+    await send_json(send, {"message": "Click recorded", "count": count})
+
+
+async def tab_clicks(scope, receive, send):
+    await send_json(send, await run_storage(site.load_counters, site.CLICK_FILE))
+
+
+async def user_stats(scope, receive, send):
+    await send_json(send, await run_storage(site.compute_user_stats))
+
+
+async def ai_usage_track(scope, receive, send):
+    data = await read_json_body(receive)
+    ai_type = data.get("ai_type")
+    if not ai_type:
+        return await send_json(send, {"error": "No ai_type provided"}, 400)
+    if not isinstance(ai_type, str):
+        return await send_json(send, {"error": "ai_type must be a string"}, 400)
+    count = await run_storage(site.record_ai_usage, ai_type, client_ip(scope))
+    await send_json(send, {"message": "AI usage tracked", "count": count})
+
+
+async def ai_usage_stats(scope, receive, send):
+    await send_json(send, await run_storage(site.load_counters, site.AI_USAGE_FILE))
+
+
+async def submit_form(scope, receive, send):
+    data = await read_json_body(receive)
+    payload, status = site.submit_form(scope["path"], data)
+    await send_json(send, payload, status)
+
+
+ROUTES = {
+    ("POST", "/tab-click"): tab_click,
+    ("GET", "/tab-clicks"): tab_clicks,
+    ("GET", "/user-stats"): user_stats,
+    ("POST", "/ai-usage-track"): ai_usage_track,
+    ("GET", "/ai-usage-stats"): ai_usage_stats,
+}
+ROUTES.update({("POST", route): submit_form for route in site.FORMS})
+
+
+# ==========================================================================
+# Geodata Refresh
+# ==========================================================================
+
+async def fetch_geodata():
+    """Async counterpart of app._fetch_geodata_background."""
+    client = _state["http"]
+    try:
+        resp_api = await client.get(site.GEOBOUNDARIES_API_URL, timeout=5)
+        resp_api.raise_for_status()
+
+        geojson_url = resp_api.json().get("gjDownloadURL")
+        if geojson_url:
+            resp_geo = await client.get(geojson_url, timeout=10)
+            resp_geo.raise_for_status()
+            await run_storage(site.store_geodata, resp_geo.text)
+    except Exception as e:
+        print(f"Background geodata fetch failed: {e}")
+    finally:
+        site.geodata_fetch_finished()
+
+
+def schedule_geodata_fetch():
+    """app.geodata_fetcher replacement; callable from any thread."""
+    asyncio.run_coroutine_threadsafe(fetch_geodata(), _state["loop"])
+
+
+# ==========================================================================
+# Application
+# ==========================================================================
+
+async def startup():
+    _state["loop"] = asyncio.get_running_loop()
+    _state["http"] = httpx.AsyncClient(
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                            max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS),
+    )
+    site.geodata_fetcher = schedule_geodata_fetch
+    site.install_profile_signal()
+    await asyncio.to_thread(site.start_background_work)
+
+
+async def shutdown():
+    await _state["http"].aclose()
+    site.render_pool.shutdown()
+    storage.shutdown(wait=True)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await startup()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    handler = ROUTES.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+    if handler is None:
+        return await wsgi(scope, receive, send)
+
+    # Native routes skip Flask's latency hooks, so time them here.
+    start = time.perf_counter()
+    status = 500
+
+    async def send_timed(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        await send(message)
+
+    route = scope["path"]
+    admitted = True
+    try:
+        if route in site.admission.routes:
+            # Shed before the body is even read.
+            admitted, reason, retry_after = site.admission.enter(route, client_ip(scope))
+            if not admitted:
+                payload, headers = site.shed_response(reason, retry_after)
+                return await send_json(send_timed, payload, 429, headers)
+        await handler(scope, receive, send_timed)
+    except BadRequest as e:
+        await send_json(send_timed, {"error": e.message}, e.status)
+    finally:
+        if admitted and route in site.admission.routes:
+            site.admission.leave(route)
+        metrics.observe("http_request_duration_seconds", time.perf_counter() - start,
+                        route=route, method=scope["method"], status=status)
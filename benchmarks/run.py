@@ -0,0 +1,338 @@
+"""
+Benchmarks
+==========
+
+Timings for the helpers.json storage layer, the compact task records
+(helpers/records.py) and the hot endpoints, so storage and rendering
+changes can be judged with numbers.
+
+Usage (from the repository root):
+    python benchmarks/run.py                          # run and print
+    python benchmarks/run.py --save benchmarks/baseline.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json --threshold 0.25
+    python benchmarks/run.py --quick --filter add_task
+
+With --baseline, the run fails (exit status 1) when any benchmark's median
+is more than `threshold` (a fraction) slower than in the baseline.
+Benchmarks missing from either side are reported but never fail the run.
+
+Every benchmark works on files in a fresh temporary directory, which is
+also the app's DATA_DIR (stores, rollups, shared state and caches), so a
+run never touches real data. Cached boundaries are copied in, not used.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.json import add_task, write_json, filter_tasks_by_status  # noqa: E402
+from helpers.records import pack, unpack  # noqa: E402
+
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+QUICK_SIZES = (1_000, 10_000)
+USER_COUNTS = (100, 10_000, 100_000)
+QUICK_USER_COUNTS = (100, 10_000)
+STATUSES = ("pending", "done", "rejected")
+DAYS = 30
+GEODATA_NAME = "india_adm1.geojson"  # app.GEODATA_FILE, relative to DATA_DIR
+
+
+# ============================================================================
+# HARNESS
+# ============================================================================
+
+class Runner:
+    """Runs the benchmarks whose names contain `only` and collects results."""
+
+    def __init__(self, only=""):
+        self.only = only
+        self.results = {}
+
+    def wanted(self, name):
+        return self.only in name
+
+    def run(self, name, fn, setup=None, repeat=5):
+        if self.wanted(name):
+            self.results[name] = measure(fn, setup, repeat)
+
+
+def measure(fn, setup=None, repeat=5):
+    """
+    Time fn() `repeat` times, calling setup() untimed before each run.
+
+    Returns:
+        dict: min/median/mean seconds and the number of runs
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "mean": statistics.fmean(times), "runs": repeat}
+
+
+def repeats_for(size):
+    """Fewer runs for the big inputs, so a full run stays in minutes."""
+    return 3 if size >= 100_000 else 5
+
+
+def _tasks(count, with_time_log=False):
+    tasks = []
+    for i in range(count):
+        task = {"name": f"task-{i}", "status": STATUSES[i % len(STATUSES)], "time": "10:00:00"}
+        if with_time_log:
+            task["time_log"] = ["09:00:00", "09:30:00", "10:00:00"]
+            task["no_of_responses"] = 3
+        tasks.append(task)
+    return tasks
+
+
+def _dated(tasks):
+    """Spread tasks over the last DAYS days (today included), like add_task(date=True) does."""
+    today = datetime.now().date()
+    days = [str(today - timedelta(days=d)) for d in range(DAYS)]
+    grouped = {day: [] for day in days}
+    for i, task in enumerate(tasks):
+        grouped[days[i % DAYS]].append(task)
+    return grouped
+
+
+def _dump(path, data):
+    # Plain json.dump: fixtures should not pay for (or depend on) write_json.
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def bench_storage(runner, workdir, sizes):
+    for size in sizes:
+        repeat = repeats_for(size)
+        for layout in ("flat", "dated"):
+            tasks = _tasks(size, with_time_log=True)
+            fixture = os.path.join(workdir, f"fixture-{layout}-{size}.json")
+            _dump(fixture, {"Tasks": _dated(tasks) if layout == "dated" else tasks})
+            target = os.path.join(workdir, f"tasks-{layout}.json")
+
+            def reset():
+                shutil.copy(fixture, target)
+
+            for counting in (False, True):
+                name = f"add_task[{layout},counting={'on' if counting else 'off'},n={size}]"
+                runner.run(name,
+                    lambda: add_task(target, {"name": "new-task"}, "pending", layout == "dated",
+                                     "Tasks", True, counting, False),
+                    setup=reset, repeat=repeat)
+
+            reset()
+            runner.run(f"filter_tasks_by_status[{layout},n={size}]",
+                lambda: filter_tasks_by_status(target, "pending", False, "Tasks"), repeat=repeat)
+            os.remove(fixture)
+
+        data = {"Tasks": _dated(_tasks(size, with_time_log=True))}
+        target = os.path.join(workdir, "time-log.json")
+        runner.run(f"write_json[time_log,n={size}]", lambda: write_json(target, data), repeat=repeat)
+
+
+def bench_records(runner, sizes):
+    for size in sizes:
+        data = {"Tasks": _dated(_tasks(size, with_time_log=True))}
+        packed = pack(data)
+        runner.run(f"records.pack[n={size}]", lambda: pack(data), repeat=repeats_for(size))
+        runner.run(f"records.unpack[n={size}]", lambda: unpack(packed), repeat=repeats_for(size))
+
+
+def bench_track_user(runner, workdir, user_counts):
+    import app
+
+    base = datetime.utcnow()
+    for count in user_counts:
+        users = [{"ip": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+                  "last_seen": (base - timedelta(minutes=i)).isoformat()} for i in range(count)]
+        fixture = os.path.join(workdir, f"users-{count}.json")
+        _dump(fixture, {"users": users})
+
+        def reset():
+            shutil.copy(fixture, app.USER_FILE)
+
+        runner.run(f"track_user[new,n={count}]",
+            lambda: app.track_user("192.0.2.1"), setup=reset, repeat=repeats_for(count))
+        runner.run(f"track_user[existing,n={count}]",
+            lambda: app.track_user(users[-1]["ip"]), setup=reset, repeat=repeats_for(count))
+        os.remove(fixture)
+
+
+def bench_endpoints(runner, quick):
+    import app
+
+    client = app.app.test_client()
+
+    def request(method, url, **kwargs):
+        def call():
+            resp = client.open(url, method=method, **kwargs)
+            assert resp.status_code < 500, f"{method} {url} -> {resp.status_code}"
+        return call
+
+    repeat = 20 if quick else 100
+    runner.run("POST /tab-click", request("POST", "/tab-click", json={"tab_id": "home"}), repeat=repeat)
+    runner.run("GET /tab-clicks", request("GET", "/tab-clicks"), repeat=repeat)
+    runner.run("GET /user-stats", request("GET", "/user-stats"), repeat=repeat)
+    runner.run("POST /ai-usage-track",
+        request("POST", "/ai-usage-track", json={"ai_type": "govt-ai"}), repeat=repeat)
+    runner.run("POST /submit_contact_form",
+        request("POST", "/submit_contact_form", json={"name": "Bench", "message": "hi"}), repeat=repeat)
+    runner.run("GET /get_map_data", request("GET", "/get_map_data"), repeat=repeat)
+
+    # Map renders: each cold run asks for a new size so it misses the image cache.
+    if not runner.wanted("/generate_map"):
+        return
+    app.render_pool.start()
+    try:
+        widths = iter(range(800, 2000, 7))
+
+        def cold_render():
+            width = next(widths)
+            for _ in range(app.MAP_RENDER_TIMEOUT * 10):
+                resp = client.get(f"/generate_map?width={width}")
+                if resp.status_code == 200:
+                    return
+                time.sleep(0.1)
+            raise RuntimeError("/generate_map did not return an image")
+
+        cold_render()  # bring the render workers up
+        runner.run("GET /generate_map[cold]", cold_render, repeat=3 if quick else 5)
+        runner.run("GET /generate_map[cached]", request("GET", "/generate_map?width=800"), repeat=repeat)
+    finally:
+        app.render_pool.shutdown()
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine(), "commit": commit, "date": datetime.now().isoformat(timespec="seconds")}
+
+
+def compare(results, baseline, threshold):
+    """
+    Benchmarks whose median regressed by more than threshold.
+
+    Returns:
+        list: (name, baseline median, current median, relative change)
+    """
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        change = current["median"] / before["median"] - 1 if before["median"] else 0.0
+        if change > threshold:
+            regressions.append((name, before["median"], current["median"], change))
+    return regressions
+
+
+def print_table(results, baseline=None):
+    width = max(len(name) for name in results)
+    print(f"{'benchmark':<{width}}  {'median':>10}  {'min':>10}  {'vs baseline':>11}")
+    for name, r in results.items():
+        delta = ""
+        if baseline and name in baseline and baseline[name]["median"]:
+            delta = f"{(r['median'] / baseline[name]['median'] - 1) * 100:+.1f}%"
+        print(f"{name:<{width}}  {r['median'] * 1000:>8.2f}ms  {r['min'] * 1000:>8.2f}ms  {delta:>11}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="small inputs only (about a minute)")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--save", metavar="FILE", help="write the results here as a new baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against this saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown of a median vs the baseline, as a fraction (default 0.25)")
+    parser.add_argument("--skip-render", action="store_true", help="skip the endpoint and /generate_map runs")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="digital-bharat-bench-")
+    data_dir = os.environ.get("DATA_DIR")
+    try:
+        # Map renders should draw the real boundaries without refetching them.
+        geodata = os.path.join(data_dir or "/tmp", GEODATA_NAME)
+        if os.path.exists(geodata):
+            shutil.copy2(geodata, workdir)
+        # app derives every path it writes from DATA_DIR at import.
+        os.environ["DATA_DIR"] = workdir
+        import app
+        # Time the work behind the rate limiter, not its 429s.
+        app.admission = app.AdmissionController(app.admission.max_concurrent, rate=float("inf"), burst=float("inf"))
+
+        runner = Runner(args.filter)
+        groups = [
+            ("storage", lambda: bench_storage(runner, workdir, QUICK_SIZES if args.quick else SIZES)),
+            ("records", lambda: bench_records(runner, QUICK_SIZES if args.quick else SIZES)),
+            ("track_user", lambda: bench_track_user(runner, workdir,
+                                                    QUICK_USER_COUNTS if args.quick else USER_COUNTS)),
+        ]
+        if not args.skip_render:
+            groups.append(("endpoints", lambda: bench_endpoints(runner, args.quick)))
+        for group, run in groups:
+            print(f"Running {group} benchmarks...", flush=True)
+            run()
+        results = runner.results
+    finally:
+        if data_dir is None:
+            os.environ.pop("DATA_DIR", None)
+        else:
+            os.environ["DATA_DIR"] = data_dir
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    print()
+    print_table(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if baseline is not None:
+        missing = sorted(name for name in set(baseline) - set(results) if runner.wanted(name))
+        if missing:
+            print(f"\nNot run this time: {', '.join(missing)}")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for name, before, after, change in regressions:
+                print(f"  {name}: {before * 1000:.2f}ms -> {after * 1000:.2f}ms ({change:+.0%})")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Gunicorn settings for serving Digital Bharat on every core:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app is imported once in the master (preload) and forked, so workers
+share the village store and other read-only data copy-on-write. Each worker
+then starts its own background jobs and render processes, sized so that all
+workers together start about one per core. Caches and job
+claims are shared through helpers/shared.py and JSON file updates are
+serialised by helpers/locks.py, so workers never lose each other's updates.
+
+Environment:
+    BIND             Address to listen on (default 0.0.0.0:5000)
+    WEB_CONCURRENCY  Worker processes (default: one per core)
+    GUNICORN_THREADS Threads per worker (default 8)
+    DATA_DIR         Where the app keeps its files (default /tmp)
+
+To profile a busy worker, send it SIGUSR2 (kill -USR2 <worker pid>); it
+samples itself for ten seconds and writes collapsed stacks to $DATA_DIR/profiles.
+"""
+
+import os
+import multiprocessing
+
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+preload_app = True
+# Map renders may queue for up to MAP_RENDER_TIMEOUT and AI answers take a while.
+timeout = 90
+graceful_timeout = 30
+
+
+def post_fork(server, worker):
+    # Thread pools and render processes must not be started before the fork.
+    import app
+    app.render_pool.workers = max(1, min(app.MAP_RENDER_WORKERS, multiprocessing.cpu_count() // workers))
+    app.start_background_work()
+
+
+def post_worker_init(worker):
+    # After the worker has set up its own signal handlers, which reset SIGUSR2.
+    import app
+    app.install_profile_signal()
+
+
+def worker_exit(server, worker):
+    import app
+    app.render_pool.shutdown()
@@ -0,0 +1,155 @@
+"""
+AI Proxy Helpers
+================
+
+Server-side client for the Gemini generateContent API, so the browser
+never sees the API key and identical questions are answered once.
+
+- normalize_prompt: Canonical form of a prompt used as the cache key
+- GeminiProxy: Pooled HTTP session, TTL/LRU response cache and
+  streaming pass-through
+"""
+
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def normalize_prompt(prompt):
+    """
+    Collapse whitespace and case so trivially different prompts share a cache entry.
+    """
+    return re.sub(r"\s+", " ", prompt).strip().casefold()
+
+
+def _candidate_text(data):
+    """Text of the first candidate in a Gemini response (or stream chunk)."""
+    try:
+        return "".join(part.get("text", "") for part in data["candidates"][0]["content"]["parts"])
+    except (KeyError, IndexError, TypeError):
+        return ""
+
+
+class GeminiProxy:
+    """
+    Calls Gemini on behalf of the browser.
+
+    Answers are cached by normalize_prompt(prompt) for `cache_ttl` seconds,
+    keeping at most `cache_size` entries (least recently used evicted first).
+    With a `shared` SharedState, answers are also shared between worker
+    processes. The HTTP session keeps up to `pool_size` connections open to
+    the API.
+    """
+
+    def __init__(self, base_url, model, api_key, cache_size=512, cache_ttl=3600, pool_size=16, timeout=60,
+                 shared=None):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+        self.shared = shared
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json", "x-goog-api-key": api_key})
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _url(self, method):
+        return f"{self.base_url}/models/{self.model}:{method}"
+
+    @staticmethod
+    def _payload(prompt):
+        return {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+
+    def cached(self, prompt):
+        """Cached answer for prompt, or None if missing or expired."""
+        key = normalize_prompt(prompt)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.cache_ttl:
+                del self._cache[key]
+                entry = None
+            if entry is not None:
+                self._cache.move_to_end(key)
+                return entry[1]
+        if self.shared is not None:
+            text = self.shared.get(f"ai:{key}")
+            if text is not None:
+                self._store(key, text)
+            return text
+        return None
+
+    def _remember(self, prompt, text):
+        if not text:
+            return
+        key = normalize_prompt(prompt)
+        self._store(key, text)
+        if self.shared is not None:
+            self.shared.set(f"ai:{key}", text, ttl=self.cache_ttl)
+
+    def _store(self, key, text):
+        with self._lock:
+            self._cache[key] = (time.monotonic(), text)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def generate(self, prompt):
+        """
+        Answer a prompt, from the cache when possible.
+
+        Returns:
+            tuple: (text, cached)
+
+        Raises:
+            requests.RequestException: If the upstream call fails
+        """
+        text = self.cached(prompt)
+        if text is not None:
+            return text, True
+        resp = self.session.post(self._url("generateContent"), json=self._payload(prompt), timeout=self.timeout)
+        resp.raise_for_status()
+        text = _candidate_text(resp.json())
+        self._remember(prompt, text)
+        return text, False
+
+    def stream(self, prompt):
+        """
+        Answer a prompt as server-sent events in Gemini's own chunk format.
+
+        Upstream events are passed through as they arrive; the joined text is
+        cached once the stream completes. A cache hit is sent as one event.
+
+        Yields:
+            str: "data: {...}" SSE events
+        """
+        text = self.cached(prompt)
+        if text is not None:
+            chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}], "cached": True}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            return
+
+        parts = []
+        with self.session.post(self._url("streamGenerateContent"), params={"alt": "sse"},
+                               json=self._payload(prompt), timeout=self.timeout, stream=True) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                try:
+                    parts.append(_candidate_text(json.loads(line[5:])))
+                except ValueError:
+                    pass
+                yield f"{line}\n\n"
+        self._remember(prompt, "".join(parts))
@@ -0,0 +1,265 @@
+"""
+Submission Analytics
+====================
+
+Columnar exports of the add_task collections (donations, problem reports,
+...) and vectorised group-by counts over them.
+
+Export:
+- task_table: Flatten a collection into NumPy columns
+- export_collection: Write a collection's columns to a .npz file
+- load_table: Read an export, cached until the file changes
+
+Queries:
+- group_counts: Rows and summed no_of_responses per group
+
+An export holds one row per stored task: its date (the collection's date
+key, NaT when undated), its weight (no_of_responses, 1 if absent) and every
+scalar field with at most MAX_CATEGORIES distinct values, dictionary-encoded
+as integer codes into a sorted array of those values. Fields with more
+(names, emails, messages) are free text: nothing to group by, and encoding
+them would cost more than it saves, so they are left out.
+"""
+
+import os
+import json
+import threading
+
+import numpy as np
+
+from helpers.json import read_json
+
+
+# Task keys that are bookkeeping rather than groupable fields.
+SKIP_FIELDS = {"time", "time_log", "no_of_responses"}
+PERIODS = ("day", "week", "month", "year")
+# Fields with more distinct values than this are free text, not categories.
+MAX_CATEGORIES = 1000
+# Above this many possible groups, fall back from bincount to sorting.
+MAX_DENSE_GROUPS = 10_000_000
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _date(value):
+    try:
+        return np.datetime64(value, "D")
+    except (TypeError, ValueError):
+        return np.datetime64("NaT", "D")
+
+
+def task_table(data, parent_key):
+    """
+    Columns of the tasks under data[parent_key].
+
+    Args:
+        data (dict): Document written by helpers.json.add_task
+        parent_key (str): Collection key, e.g. "Donations Made"
+
+    Returns:
+        dict: "date" (datetime64[D]), "weight" (int64) and, per categorical
+        field, "<field>" -> (codes int32, sorted distinct values)
+    """
+    groups = data.get(parent_key, [])
+    items = groups.items() if isinstance(groups, dict) else [(None, groups)]
+
+    rows, dates = [], []
+    for date, tasks in items:
+        day = _date(date) if date else np.datetime64("NaT", "D")
+        for task in tasks:
+            if isinstance(task, dict):
+                rows.append(task)
+                dates.append(day)
+
+    names = []
+    for task in rows:
+        for key, value in task.items():
+            if key not in SKIP_FIELDS and not isinstance(value, (dict, list)) and key not in names:
+                names.append(key)
+
+    table = {
+        "date": np.array(dates, dtype="datetime64[D]"),
+        "weight": np.array([t.get("no_of_responses", 1) for t in rows], dtype=np.int64),
+    }
+    for name in names:
+        encoded = _categories([_label(t.get(name)) for t in rows])
+        if encoded is not None:
+            table[name] = encoded
+    return table
+
+
+def _label(value):
+    return "" if value is None or isinstance(value, (dict, list)) else str(value)
+
+
+def _categories(labels):
+    """
+    Dictionary-encode labels.
+
+    Returns:
+        tuple or None: (codes int32, sorted distinct values), None once there
+        are more than MAX_CATEGORIES distinct values
+    """
+    distinct = set()
+    for label in labels:
+        distinct.add(label)
+        if len(distinct) > MAX_CATEGORIES:
+            return None
+    values = sorted(distinct)
+    index = {value: i for i, value in enumerate(values)}
+    codes = np.fromiter((index[label] for label in labels), dtype=np.int32, count=len(labels))
+    return codes, np.array(values, dtype=str)
+
+
+def export_collection(json_path, parent_key, out_path):
+    """
+    Export a collection to a .npz file (written atomically).
+
+    Returns:
+        int: Rows exported
+    """
+    table = task_table(read_json(json_path, default={}), parent_key)
+    arrays = {"date": table.pop("date"), "weight": table.pop("weight")}
+    for name, (codes, values) in table.items():
+        arrays[f"codes:{name}"] = codes
+        arrays[f"values:{name}"] = values
+    arrays["meta"] = np.array(json.dumps({
+        "source": json_path,
+        "source_mtime": os.path.getmtime(json_path),
+        "fields": list(table),
+    }))
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, out_path)
+    return len(arrays["date"])
+
+
+def load_table(path):
+    """
+    An export as {"date", "weight", "meta", "fields": {name: (codes, values)}}.
+
+    Returns:
+        dict or None: None if the export does not exist
+    """
+    try:
+        version = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _tables_lock:
+        entry = _tables.get(path)
+        if entry is None or entry[0] != version:
+            with np.load(path, allow_pickle=False) as npz:
+                meta = json.loads(str(npz["meta"]))
+                table = {
+                    "date": npz["date"],
+                    "weight": npz["weight"],
+                    "meta": meta,
+                    "fields": {name: (npz[f"codes:{name}"], npz[f"values:{name}"]) for name in meta["fields"]},
+                }
+            entry = _tables[path] = (version, table)
+        return entry[1]
+
+
+def _date_groups(dates, period):
+    """Integer group codes and labels for dates bucketed by period."""
+    if period == "month":
+        buckets = dates.astype("datetime64[M]").astype(np.int64)
+        unit = "M"
+    elif period == "year":
+        buckets = dates.astype("datetime64[Y]").astype(np.int64)
+        unit = "Y"
+    else:
+        buckets = dates.astype(np.int64)
+        if period == "week":
+            # Label each week by its Monday (1970-01-01 was a Thursday).
+            buckets = buckets - (buckets + 3) % 7
+        unit = "D"
+
+    valid = ~np.isnat(dates)
+    if not valid.any():
+        return np.zeros(len(dates), dtype=np.int64), [None]
+    low, high = buckets[valid].min(), buckets[valid].max()
+    # Undated rows get the last code.
+    codes = np.where(valid, buckets - low, high - low + 1)
+    labels = [str(np.datetime64(int(b), unit)) for b in range(low, high + 1)] + [None]
+    return codes, labels
+
+
+def group_counts(table, by, period="day", where=None, start=None, end=None):
+    """
+    Count rows and responses per distinct combination of the `by` fields.
+
+    Args:
+        table (dict): From load_table
+        by (list): Field names; "date" groups by the date bucketed by period
+        period (str): "day", "week" (Monday start), "month" or "year"
+        where (dict): Optional {field: value} equality filters
+        start, end (str): Optional inclusive YYYY-MM-DD date range
+
+    Returns:
+        list: [{field: label, ..., "count": rows, "responses": summed weight}]
+        sorted by the group labels
+
+    Raises:
+        KeyError: For an unknown field
+        ValueError: For an unknown period or a bad date
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    fields = table["fields"]
+    for name in by:
+        if name != "date" and name not in fields:
+            raise KeyError(name)
+    for name in where or {}:
+        if name not in fields:
+            raise KeyError(name)
+
+    dates, weight = table["date"], table["weight"]
+    mask = np.ones(len(dates), dtype=bool)
+    for name, value in (where or {}).items():
+        codes, values = fields[name]
+        i = np.searchsorted(values, value)
+        mask &= (codes == i) if i < len(values) and values[i] == value else False
+    if start:
+        mask &= dates >= np.datetime64(start, "D")
+    if end:
+        mask &= dates <= np.datetime64(end, "D")
+
+    group_codes, labels = [], []
+    for name in by:
+        if name == "date":
+            codes, names = _date_groups(dates[mask], period)
+        else:
+            codes, values = fields[name]
+            codes, names = codes[mask].astype(np.int64), list(values)
+        group_codes.append(codes)
+        labels.append(names)
+
+    dims = [len(names) for names in labels]
+    if np.prod(dims, dtype=np.float64) >= 2 ** 62:
+        raise ValueError("Too many groups")
+    total = int(np.prod(dims, dtype=np.int64))
+    keys = np.ravel_multi_index(group_codes, dims) if by else np.zeros(int(mask.sum()), dtype=np.int64)
+
+    if total <= MAX_DENSE_GROUPS:
+        counts = np.bincount(keys, minlength=total)
+        responses = np.bincount(keys, weights=weight[mask], minlength=total)
+        present = np.flatnonzero(counts)
+        counts, responses = counts[present], responses[present]
+    else:
+        present, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse)
+        responses = np.bincount(inverse, weights=weight[mask])
+
+    result = []
+    positions = np.unravel_index(present, dims) if by else ()
+    for row, key in enumerate(present):
+        group = {name: labels[i][positions[i][row]] for i, name in enumerate(by)}
+        group["count"] = int(counts[row])
+        group["responses"] = int(responses[row])
+        result.append(group)
+    return result
@@ -0,0 +1,137 @@
+"""
+Geo Helpers
+===========
+
+State boundary lookups against the geoBoundaries ADM1 GeoJSON.
+
+Boundaries:
+- load_states: Parse the ADM1 GeoJSON once per file version
+
+Point in Polygon:
+- state_at: Name of the state containing a point
+- assign_states: Batch point-in-polygon for many points at once
+- check_states: Compare declared village states with the polygons
+- state_counts: Village counts per state and status
+
+geopandas is imported on first use, so importing this module is cheap.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from helpers.lazy import lazy_import
+
+
+_states_cache = {}
+_states_lock = threading.Lock()
+
+
+def load_states(geodata_path):
+    """
+    Parse the ADM1 GeoJSON, reusing the previous parse until the file changes.
+
+    Args:
+        geodata_path (str): Path to the ADM1 GeoJSON
+
+    Returns:
+        GeoDataFrame or None: State polygons (EPSG:4326), None if the file is missing
+    """
+    try:
+        version = (geodata_path, os.path.getmtime(geodata_path))
+    except OSError:
+        return None
+    with _states_lock:
+        if _states_cache.get("version") != version:
+            states = lazy_import("geopandas").read_file(geodata_path)
+            states.sindex  # build the STRtree now rather than on the first query
+            _states_cache["version"] = version
+            _states_cache["states"] = states
+        return _states_cache["states"]
+
+
+def state_at(states, lon, lat):
+    """
+    Name of the state whose polygon contains the point.
+
+    Args:
+        states (GeoDataFrame): From load_states
+        lon, lat (float): Point in degrees
+
+    Returns:
+        str or None: shapeName of the state, None if outside every state
+    """
+    return assign_states(states, [lon], [lat])[0]
+
+
+def assign_states(states, lon, lat):
+    """
+    State name for every point, in one bulk STRtree query.
+
+    This is the join gpd.sjoin(points, states, predicate="intersects")
+    performs, without building a points GeoDataFrame: the tree narrows each
+    point to candidate polygons by bounding box and the exact test runs
+    vectorised in shapely. A point on a shared border gets the first state.
+
+    Args:
+        states (GeoDataFrame): From load_states
+        lon, lat (np.ndarray): Points in degrees
+
+    Returns:
+        np.ndarray: Object array of state names, None where no state matches
+    """
+    points = lazy_import("geopandas").points_from_xy(lon, lat)
+    point_idx, state_idx = states.sindex.query(points, predicate="intersects")
+
+    first = np.full(len(points), len(states), dtype=np.int64)
+    np.minimum.at(first, point_idx, state_idx)
+
+    names = np.append(states["shapeName"].to_numpy(dtype=object), None)
+    return names[first]
+
+
+def check_states(declared, found):
+    """
+    Compare declared states with the polygon lookup.
+
+    Args:
+        declared (np.ndarray): State names as entered (blank if unknown)
+        found (np.ndarray): Result of assign_states
+
+    Returns:
+        dict: Boolean masks "missing" (no declared state), "unmatched"
+        (outside every polygon) and "mismatched" (declared != found)
+    """
+    declared_key = np.char.lower(np.char.strip(declared.astype(str)))
+    found_key = np.char.lower(np.where(np.equal(found, None), "", found).astype(str))
+    missing = declared_key == ""
+    unmatched = found_key == ""
+    return {
+        "missing": missing,
+        "unmatched": unmatched,
+        "mismatched": ~missing & ~unmatched & (declared_key != found_key),
+    }
+
+
+def state_counts(state, status):
+    """
+    Village counts per state, split by status.
+
+    Args:
+        state, status (np.ndarray): Aligned per-village arrays
+
+    Returns:
+        dict: {state: {"total": n, status: n, ...}}, states sorted by name
+    """
+    states, state_codes = np.unique(state.astype(str), return_inverse=True)
+    statuses, status_codes = np.unique(status.astype(str), return_inverse=True)
+    counts = np.bincount(state_codes * len(statuses) + status_codes,
+                         minlength=len(states) * len(statuses)).reshape(len(states), len(statuses))
+
+    result = {}
+    for state_name, row in zip(states, counts):
+        entry = {"total": int(row.sum())}
+        entry.update({str(name): int(n) for name, n in zip(statuses, row) if n})
+        result[str(state_name)] = entry
+    return result
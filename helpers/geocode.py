@@ -0,0 +1,193 @@
+"""
+Reverse Geocoding
+=================
+
+Server-side reverse geocoding shared by every visitor, in front of the
+OpenStreetMap Nominatim /reverse API.
+
+- ReverseGeocoder: Coordinate-quantised LRU + persistent cache, request
+  coalescing, upstream rate limiting and an offline fallback
+"""
+
+import time
+import atexit
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import requests
+
+from helpers.json import read_json, write_json
+from helpers.locks import write_lock
+
+
+class ReverseGeocoder:
+    """
+    Reverse geocoder with a shared cache.
+
+    Coordinates are rounded to `precision` decimals (3 ~ 110 m) and the
+    rounded pair is the cache key. Concurrent lookups of the same key wait
+    on one upstream call, and upstream calls are spaced at least
+    `min_interval` seconds apart (Nominatim allows one per second). When the
+    upstream fails, or offline mode is asked for, `offline(lat, lon)` answers
+    instead and that answer is not cached. So does a lookup that would wait
+    more than `max_wait` seconds for its upstream turn.
+
+    With a `shared` SharedState, answers are shared between worker processes
+    for `shared_ttl` seconds and the upstream spacing holds across all of
+    them. New answers reach cache_file at most every `persist_interval`
+    seconds, written from a background thread, and once more at exit.
+    """
+
+    def __init__(self, url, cache_file, offline=None, precision=3, cache_size=10000,
+                 min_interval=1.0, timeout=5, user_agent="Digital-Bharat/1.0", shared=None,
+                 shared_ttl=7 * 24 * 3600, max_wait=3.0, persist_interval=30.0):
+        self.url = url
+        self.cache_file = cache_file
+        self.offline = offline
+        self.precision = precision
+        self.cache_size = cache_size
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self.max_wait = max_wait
+        self.persist_interval = persist_interval
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+
+        self._lock = threading.Lock()
+        self._rate_lock = threading.Lock()
+        self._next_call = 0.0
+        self._inflight = {}
+        self._persist_timer = None
+        self._cache = OrderedDict()
+        for key, value in read_json(cache_file, default={}).items():
+            self._cache[key] = value
+        while len(self._cache) > cache_size:
+            self._cache.popitem(last=False)
+        atexit.register(self.flush)
+
+    def _key(self, lat, lon):
+        return f"{round(lat, self.precision):.{self.precision}f},{round(lon, self.precision):.{self.precision}f}"
+
+    def lookup(self, lat, lon, offline=False):
+        """
+        Reverse geocode a point.
+
+        Args:
+            lat, lon (float): Point in degrees
+            offline (bool): Skip the upstream and answer from local data
+
+        Returns:
+            dict: {"display_name", "address", "source"}; source is
+            "cache", "nominatim" or "offline"
+        """
+        if offline:
+            return self._offline(lat, lon)
+
+        key = self._key(lat, lon)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return {**cached, "source": "cache"}
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+
+        if not owner:
+            result = future.result()
+            return {**result, "source": "nominatim"} if result is not None else self._offline(lat, lon)
+
+        result = None
+        try:
+            result = self.shared.get(f"geocode:{key}") if self.shared is not None else None
+            if result is not None:
+                self._remember(key, result)
+                return {**result, "source": "cache"}
+            result = self._fetch(key)
+            self._remember(key, result)
+            if self.shared is not None:
+                self.shared.set(f"geocode:{key}", result, ttl=self.shared_ttl)
+            self._schedule_persist()
+            return {**result, "source": "nominatim"}
+        except Exception as e:
+            print("Reverse geocoding failed, answering offline:", e)
+            return self._offline(lat, lon)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            future.set_result(result)
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _wait_turn(self):
+        """
+        Block until an upstream call is allowed.
+
+        Raises:
+            TimeoutError: If that would take more than max_wait seconds
+        """
+        if self.shared is not None:
+            deadline = time.monotonic() + self.max_wait
+            while not self.shared.claim("geocode:next-call", ttl=self.min_interval):
+                if time.monotonic() >= deadline:
+                    raise TimeoutError("Upstream queue too long")
+                time.sleep(self.min_interval / 10)
+            return
+        with self._rate_lock:
+            wait = self._next_call - time.monotonic()
+            if wait > self.max_wait:
+                raise TimeoutError("Upstream queue too long")
+            # Take the slot before sleeping so the next caller queues behind it.
+            self._next_call = max(self._next_call, time.monotonic()) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def _fetch(self, key):
+        lat, lon = key.split(",")
+        self._wait_turn()
+        resp = self.session.get(self.url, params={"format": "json", "lat": lat, "lon": lon},
+                                timeout=self.timeout)
+        resp.raise_for_status()
+        data = resp.json()
+        return {"display_name": data.get("display_name", ""), "address": data.get("address", {})}
+
+    def _offline(self, lat, lon):
+        result = self.offline(lat, lon) if self.offline else None
+        return {**(result or {"display_name": "", "address": {}}), "source": "offline"}
+
+    def _schedule_persist(self):
+        with self._lock:
+            if self._persist_timer is not None:
+                return
+            self._persist_timer = threading.Timer(self.persist_interval, self.flush)
+            self._persist_timer.daemon = True
+            self._persist_timer.start()
+
+    def flush(self):
+        """
+        Merge the cache into cache_file if answers were added since the last
+        write. Other processes write the same file, so their entries are kept;
+        the newest cache_size entries survive.
+        """
+        with self._lock:
+            if self._persist_timer is None:
+                return
+            self._persist_timer.cancel()
+            self._persist_timer = None
+            snapshot = list(self._cache.items())
+        with write_lock(self.cache_file):
+            merged = read_json(self.cache_file, default={})
+            if not isinstance(merged, dict):
+                merged = {}
+            for key, value in snapshot:
+                merged.pop(key, None)
+                merged[key] = value
+            write_json(self.cache_file, dict(list(merged.items())[-self.cache_size:]))
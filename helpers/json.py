@@ -29,15 +29,26 @@ Utility Functions:
 - backup_json: Create timestamped backups
 - clear_json, delete_key, rename_key: File and key management
 - get_all_keys: Retrieve all keys (nested or flat)
+
+Every function is safe to call from several threads and processes at once:
+reads take the file's shared lock and read-modify-write functions hold its
+exclusive lock throughout (see helpers/locks.py). Each write also leaves a
+binary snapshot next to the file (helpers/snapshot.py) that count_entries
+and get_all_keys read instead of parsing the JSON.
 """
 
 import json
 import os
+import time
 from datetime import datetime
 import shutil
 from copy import deepcopy
 import re
 
+from helpers.locks import read_lock, write_lock, locked_update
+from helpers.snapshot import write_snapshot, load_snapshot
+from helpers.metrics import json_io
+
 
 # ============================================================================
 # UTILITY FUNCTIONS
@@ -92,22 +103,27 @@ def read_json(file_path, default=None):
     Returns:
         dict: Parsed JSON data or default value
     """
-    if not os.path.exists(file_path):
-        # Auto-create the file with default content
-        default_data = default or {}
-        with open(file_path, 'w') as f:
-            json.dump(default_data, f, indent=4)
-        return default_data
-
-    try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        # Optionally overwrite with default if corrupted
-        default_data = default or {}
-        with open(file_path, 'w') as f:
-            json.dump(default_data, f, indent=4)
-        return default_data
+    with read_lock(file_path):
+        try:
+            start = time.perf_counter()
+            with open(file_path, 'r') as f:
+                data = json.load(f)
+                json_io("read", file_path, os.fstat(f.fileno()).st_size, time.perf_counter() - start)
+                return data
+        except (json.JSONDecodeError, FileNotFoundError):
+            pass
+
+    with write_lock(file_path):
+        # Check again: another writer may have created it meanwhile
+        try:
+            with open(file_path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            # Auto-create the file (or overwrite it if corrupted) with default content
+            default_data = default or {}
+            with open(file_path, 'w') as f:
+                json.dump(default_data, f, indent=4)
+            return default_data
 
 
 def write_json(path, data):
@@ -119,6 +135,7 @@ def write_json(path, data):
         data (dict): JSON data
     """
     # Step 1: Convert to pretty JSON
+    start = time.perf_counter()
     raw = json.dumps(data, indent=4)
 
     # Step 2: Make time_log one-liner
@@ -134,12 +151,22 @@ def write_json(path, data):
         flags=re.DOTALL
     )
 
+    encode_seconds = time.perf_counter() - start
+
     # Step 3: Ensure parent directory exists
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
 
-    # Step 4: Write to file
-    with open(path, "w", encoding="utf-8") as file:
-        file.write(raw)
+    # Step 4: Write to a temp file and swap it in, so readers never see half a file
+    with write_lock(path):
+        start = time.perf_counter()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(raw)
+        os.replace(tmp_path, path)
+        json_io("write", path, os.path.getsize(path), encode_seconds + time.perf_counter() - start)
+
+        # Step 5: Refresh the binary snapshot for read-only queries
+        write_snapshot(path, data)
 
 
 
@@ -161,7 +188,8 @@ def backup_json(file_path, backup_dir='backups'):
     base_name = os.path.basename(file_path)
     timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
     backup_file = os.path.join(backup_dir, f"{base_name}.{timestamp}.bak.json")
-    shutil.copy(file_path, backup_file)
+    with read_lock(file_path):
+        shutil.copy(file_path, backup_file)
     return backup_file
 
 
@@ -204,6 +232,7 @@ def get_value(file_path, path_list, default=None):
     return ref
 
 
+@locked_update
 def set_value(file_path, key, value):
     """
     Set or replace a root-level key with a value.
@@ -218,6 +247,7 @@ def set_value(file_path, key, value):
     write_json(file_path, data)
 
 
+@locked_update
 def update_nested(file_path, path_list, value):
     """
     Update a nested key path in the JSON file.
@@ -261,6 +291,7 @@ def key_exists(file_path, path_list):
     return True
 
 
+@locked_update
 def ensure_key(file_path, key, default_value):
     """
     Ensure a key exists in the root of the JSON file.
@@ -277,6 +308,7 @@ def ensure_key(file_path, key, default_value):
         write_json(file_path, data)
 
 
+@locked_update
 def delete_key(file_path, key):
     """
     Delete a root-level key from the JSON file if it exists.
@@ -291,6 +323,7 @@ def delete_key(file_path, key):
         write_json(file_path, data)
 
 
+@locked_update
 def rename_key(file_path, old_key, new_key):
     """
     Rename a root-level key in the JSON file.
@@ -317,6 +350,10 @@ def get_all_keys(file_path, nested=False):
     Returns:
         list: List of keys
     """
+    snapshot = load_snapshot(file_path)
+    if snapshot is not None:
+        return snapshot.flat_keys() if nested else snapshot.keys()
+
     data = read_json(file_path, default={})
     if nested:
         return list(flatten_json(data).keys())
@@ -324,6 +361,7 @@ def get_all_keys(file_path, nested=False):
         return list(data.keys())
 
 
+@locked_update
 def increment_counter(file_path, key, amount=1):
     """
     Increment a numeric counter under a key. Creates the key if missing.
@@ -344,6 +382,7 @@ def increment_counter(file_path, key, amount=1):
 # LIST OPERATIONS
 # ============================================================================
 
+@locked_update
 def append_to_list(file_path, key, value):
     """
     Append a value to a list at the root-level key.
@@ -361,6 +400,7 @@ def append_to_list(file_path, key, value):
     write_json(file_path, data)
 
 
+@locked_update
 def remove_from_list(file_path, key, condition_func):
     """
     Remove elements from a list based on a condition function.
@@ -399,6 +439,7 @@ def filter_by_key_value(file_path, key, filter_key, filter_value):
     return []
 
 
+@locked_update
 def sort_list_by_key(file_path, list_key, sort_key, reverse=False):
     """
     Sort a list of dictionaries by a specified key.
@@ -429,6 +470,10 @@ def count_entries(file_path, key):
     Returns:
         int: Number of entries (0 if key doesn't exist or isn't a list)
     """
+    snapshot = load_snapshot(file_path)
+    if snapshot is not None:
+        return snapshot.list_length(key)
+
     data = read_json(file_path, default={})
     if key in data and isinstance(data[key], list):
         return len(data[key])
@@ -439,6 +484,7 @@ def count_entries(file_path, key):
 # DATA MERGING AND TRANSFORMATION
 # ============================================================================
 
+@locked_update
 def merge_json(file_path, new_data, overwrite=True):
     """
     Merge new_data into the root of the existing JSON file.
@@ -455,6 +501,7 @@ def merge_json(file_path, new_data, overwrite=True):
     write_json(file_path, data)
 
 
+@locked_update
 def deep_merge_json(file_path, new_data):
     """
     Recursively merge new_data into the JSON file.
@@ -528,6 +575,7 @@ def unflatten_json(flat_data, sep='.'):
 # TASK MANAGEMENT FUNCTIONS
 # ============================================================================
 
+@locked_update
 def add_task(file_path="tasks.json", task_data="", status="pending", date=False, parent_key="tasks",
              time=False, counting=False, latest_time=True):
     """
@@ -601,6 +649,7 @@ def add_task(file_path="tasks.json", task_data="", status="pending", date=False,
     write_json(file_path, data)
 
 
+@locked_update
 def update_task_status(file_path, task_identifier, new_status, date=False, parent_key="tasks"):
     """
     Update the status of a task by index or name.
@@ -0,0 +1,61 @@
+"""
+Lazy Imports
+============
+
+Keeps the geo and plotting stack (geopandas, matplotlib) out of process
+startup, and records what imports cost so regressions are visible.
+
+- lazy_import: Import a module on first use and time it
+- timed_import: Context manager timing a block of eager imports
+- import_times: Seconds spent per import label in this process
+"""
+
+import sys
+import time
+import importlib
+import threading
+from contextlib import contextmanager
+
+
+_times = {}
+_times_lock = threading.Lock()
+
+
+def _record(label, seconds):
+    with _times_lock:
+        _times[label] = _times.get(label, 0.0) + seconds
+
+
+def lazy_import(name):
+    """
+    The module `name`, importing (and timing) it the first time it is needed.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    _record(name, time.perf_counter() - start)
+    return module
+
+
+@contextmanager
+def timed_import(label):
+    """
+    Time the imports inside the block under `label`.
+
+    Usage:
+        with timed_import("flask"):
+            from flask import Flask
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(label, time.perf_counter() - start)
+
+
+def import_times():
+    """{label: seconds} for this process, slowest first."""
+    with _times_lock:
+        return {label: round(seconds, 4) for label, seconds in sorted(_times.items(), key=lambda item: -item[1])}
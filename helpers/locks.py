@@ -0,0 +1,133 @@
+"""
+File Locks
+==========
+
+Cross-process reader/writer locks for the JSON files under DATA_DIR, built on
+fcntl advisory locks held on a sidecar "<file>.lock".
+
+- read_lock: Shared lock; any number of readers, no writer
+- write_lock: Exclusive lock, held around a whole read-modify-write
+- locked_update: Decorator holding write_lock(file_path) for a whole call
+- lock_stats: Acquisitions, contention and wait times per file
+
+Locks are reentrant within a thread: a thread holding a file's write lock
+may take its read or write lock again. Upgrading a held read lock to a
+write lock is refused, since two upgrading readers would deadlock.
+"""
+
+import os
+import time
+import fcntl
+import inspect
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+
+_held = threading.local()
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _held_locks():
+    if not hasattr(_held, "locks"):
+        _held.locks = {}
+    return _held.locks
+
+
+def _record(path, mode, waited, contended):
+    with _stats_lock:
+        entry = _stats.setdefault(path, {
+            "read": 0, "write": 0, "contended": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0})
+        entry[mode] += 1
+        if contended:
+            entry["contended"] += 1
+            entry["wait_seconds"] += waited
+            entry["max_wait_seconds"] = max(entry["max_wait_seconds"], waited)
+
+
+@contextmanager
+def _lock(path, mode):
+    path = os.path.abspath(path)
+    held = _held_locks()
+    current = held.get(path)
+    if current is not None:
+        if mode == "write" and current[0] == "read":
+            raise RuntimeError(f"Cannot upgrade read lock on {path} to a write lock")
+        held[path] = (current[0], current[1] + 1, current[2])
+        try:
+            yield
+        finally:
+            mode_, depth, fd = held[path]
+            held[path] = (mode_, depth - 1, fd)
+        return
+
+    operation = fcntl.LOCK_EX if mode == "write" else fcntl.LOCK_SH
+    fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        start = time.perf_counter()
+        try:
+            fcntl.flock(fd, operation | fcntl.LOCK_NB)
+            contended = False
+        except BlockingIOError:
+            fcntl.flock(fd, operation)
+            contended = True
+        _record(path, mode, time.perf_counter() - start, contended)
+
+        held[path] = (mode, 1, fd)
+        try:
+            yield
+        finally:
+            del held[path]
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def read_lock(path):
+    """
+    Shared lock on path: blocks only while a writer holds it.
+
+    Usage:
+        with read_lock(path):
+            data = json.load(open(path))
+    """
+    return _lock(path, "read")
+
+
+def write_lock(path):
+    """
+    Exclusive lock on path: hold it from the read to the write of an update
+    so no other thread or process can slip a write in between.
+    """
+    return _lock(path, "write")
+
+
+def locked_update(fn):
+    """
+    Run fn(file_path, ...) while holding write_lock(file_path).
+
+    fn's file argument must be named file_path (or path).
+    """
+    signature = inspect.signature(fn)
+    name = "file_path" if "file_path" in signature.parameters else "path"
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        with write_lock(bound.arguments[name]):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def lock_stats():
+    """
+    Lock counters for this process, per file.
+
+    Returns:
+        dict: {path: {"read", "write", "contended", "wait_seconds",
+        "max_wait_seconds"}}; waits only count acquisitions that had to block
+    """
+    with _stats_lock:
+        return {path: dict(entry) for path, entry in _stats.items()}
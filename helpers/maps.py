@@ -0,0 +1,693 @@
+"""
+Map Rendering Helpers
+=====================
+
+Matplotlib rendering of the "Village Impact Across India" map. Rendering runs
+in a small pool of worker processes so a slow render never holds the GIL of
+the Flask process that serves forms and tracking requests.
+
+Village Data:
+- village_mask: Select villages by status, state and bounding box
+- status_priority, jitter_duplicates, place_labels: Vectorised layout helpers
+
+geopandas and matplotlib are imported on first use (see helpers/lazy.py),
+so processes that only serve forms and tracking never load them.
+
+Rendering (runs inside a worker process):
+- init_worker: Warm a worker with the plotting stack, villages and geodata
+- render_map: Render the map as PNG, WebP or SVG bytes
+- render_tile: Render one 256px slippy-map tile as PNG or Mapbox Vector Tile
+
+Tiles:
+- lonlat_to_mercator, tile_bounds, tile_range: Web Mercator tile arithmetic
+
+Render Pool:
+- RenderPool: Warm process pool with a bounded LRU image cache, a bounded
+  queue, request coalescing and a last-good-image fallback on timeout
+"""
+
+import io
+import os
+import sys
+import math
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from helpers.villages import village_arrays
+from helpers.lazy import lazy_import
+
+
+# Label placement: lower priority value wins a contested spot on the map.
+STATUS_PRIORITY = {"Model Village": 0, "Connected": 1, "Developing": 2}
+STATUS_COLORS = {"Model Village": "#00B383", "Connected": "#2563EB", "Developing": "#FF6B00"}
+MAX_MAP_LABELS = 60
+LABEL_THRESHOLD = 0.3
+LABEL_OFFSETS = np.arange(1, 7) * 0.2
+
+MAP_FORMATS = {"png": "image/png", "webp": "image/webp", "svg": "image/svg+xml"}
+
+TILE_SIZE = 256
+TILE_FORMATS = {"png": "image/png", "mvt": "application/vnd.mapbox-vector-tile"}
+# Half the width of the Web Mercator world, in metres.
+MERCATOR_HALF = math.pi * 6378137.0
+
+# Villages sharing a coordinate (to 3 decimals) are nudged apart by up to this
+# many degrees; the fixed seed keeps the rendered map identical between runs.
+MAP_JITTER = 0.05
+MAP_JITTER_SEED = 7
+
+
+# ============================================================================
+# VILLAGE DATA
+# ============================================================================
+
+def village_mask(villages, statuses=None, state=None, bbox=None):
+    """
+    Boolean mask of the villages matching every given filter.
+
+    Args:
+        villages (dict): Arrays from village_arrays
+        statuses (list): Keep only these statuses
+        state (str): Keep only this state (case-insensitive)
+        bbox (tuple): (min_lon, min_lat, max_lon, max_lat)
+
+    Returns:
+        np.ndarray: Boolean mask over the village arrays
+    """
+    mask = np.ones(len(villages["lat"]), dtype=bool)
+    if statuses:
+        mask &= np.isin(villages["status"], list(statuses))
+    if state:
+        mask &= np.char.lower(villages["state"].astype(str)) == state.lower()
+    if bbox:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        lon, lat = villages["lon"], villages["lat"]
+        mask &= (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+    return mask
+
+
+def status_priority(status):
+    """
+    Map a status array onto STATUS_PRIORITY ranks; unknown statuses rank last.
+    """
+    priority = np.full(len(status), len(STATUS_PRIORITY))
+    for value, rank in STATUS_PRIORITY.items():
+        priority[status == value] = rank
+    return priority
+
+
+def jitter_duplicates(lat, lon, seed=MAP_JITTER_SEED):
+    """
+    Nudge every point that repeats an earlier coordinate so markers don't stack.
+
+    Args:
+        lat, lon (np.ndarray): Coordinates in degrees
+        seed (int): Seed for the jitter RNG
+
+    Returns:
+        tuple: New (lat, lon) arrays; first occurrences are left untouched
+    """
+    keys = np.round(np.column_stack((lat, lon)), 3)
+    _, first = np.unique(keys, axis=0, return_index=True)
+    repeated = np.ones(len(lat), dtype=bool)
+    repeated[first] = False
+
+    jitter = np.random.default_rng(seed).uniform(-MAP_JITTER, MAP_JITTER, size=(repeated.sum(), 2))
+    lat = lat.copy()
+    lon = lon.copy()
+    lat[repeated] += jitter[:, 0]
+    lon[repeated] += jitter[:, 1]
+    return lat, lon
+
+
+def place_labels(x, y, priority, threshold=LABEL_THRESHOLD, max_labels=MAX_MAP_LABELS):
+    """
+    Choose which points get a text label and how far above the point it sits.
+
+    Points are ranked by priority (then input order) and thinned to one
+    candidate per threshold-sized grid cell, so the greedy pass only ever sees
+    a bounded number of candidates. Each candidate tries every offset in
+    LABEL_OFFSETS at once against the labels already placed; candidates with
+    no free offset are left unlabelled.
+
+    Args:
+        x, y (np.ndarray): Point coordinates
+        priority (np.ndarray): Lower values are labelled first
+        threshold (float): Minimum distance on both axes between two labels
+        max_labels (int): Maximum number of labels to place
+
+    Returns:
+        tuple: (indices into x/y, label y positions) in placement order
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.size == 0 or max_labels <= 0:
+        return np.empty(0, dtype=int), np.empty(0)
+
+    order = np.lexsort((np.arange(x.size), priority))
+    cells = np.floor(np.column_stack((x[order], y[order])) / threshold).astype(np.int64)
+    _, first = np.unique(cells, axis=0, return_index=True)
+    candidates = order[np.sort(first)]
+
+    placed_x = np.empty(max_labels)
+    placed_y = np.empty(max_labels)
+    chosen = np.empty(max_labels, dtype=int)
+    count = 0
+
+    for i in candidates:
+        ys = y[i] + LABEL_OFFSETS
+        near_x = np.abs(placed_x[:count] - x[i]) < threshold
+        clash = near_x & (np.abs(placed_y[:count] - ys[:, None]) < threshold)
+        free = ~clash.any(axis=1)
+        if not free.any():
+            continue
+        placed_x[count] = x[i]
+        placed_y[count] = ys[free.argmax()]
+        chosen[count] = i
+        count += 1
+        if count == max_labels:
+            break
+
+    return chosen[:count], placed_y[:count]
+
+
+# ============================================================================
+# RENDERING (WORKER PROCESS)
+# ============================================================================
+
+# Per-process state filled in by init_worker.
+_worker = {}
+
+
+def _pyplot():
+    """matplotlib.pyplot on the Agg backend, imported on first use."""
+    if "matplotlib.pyplot" not in sys.modules:
+        lazy_import("matplotlib").use("Agg")
+    return lazy_import("matplotlib.pyplot")
+
+
+def init_worker(villages, geodata_path=None):
+    """
+    Process-pool initializer: import-time work happens once per worker.
+
+    Args:
+        villages (dict/list): Column arrays (VillageStore.columns) or village dicts
+        geodata_path (str): Optional ADM1 GeoJSON to parse up front
+    """
+    _worker["villages"] = villages if isinstance(villages, dict) else village_arrays(villages)
+    _pyplot()
+    lazy_import("geopandas")
+    if geodata_path:
+        _load_states(geodata_path)
+
+
+def _load_states(geodata_path):
+    """
+    Parse the ADM1 GeoJSON, reusing the previous parse until the file changes.
+    """
+    mtime = os.path.getmtime(geodata_path)
+    cached = _worker.get("states")
+    if cached and cached[0] == (geodata_path, mtime):
+        return cached[1]
+    states = lazy_import("geopandas").read_file(geodata_path)
+    _worker["states"] = ((geodata_path, mtime), states)
+    return states
+
+
+def _load_states_mercator(geodata_path):
+    """ADM1 boundaries in EPSG:3857, cached alongside the lon/lat parse."""
+    states = _load_states(geodata_path)
+    cached = _worker.get("states_3857")
+    if cached and cached[0] is states:
+        return cached[1]
+    projected = states.to_crs(epsg=3857)
+    _worker["states_3857"] = (states, projected)
+    return projected
+
+
+def _villages_mercator():
+    if "villages_3857" not in _worker:
+        villages = _worker["villages"]
+        _worker["villages_3857"] = lonlat_to_mercator(villages["lon"], villages["lat"])
+    return _worker["villages_3857"]
+
+
+def ping():
+    """No-op task used to bring every pool worker up front."""
+    return os.getpid()
+
+
+def render_map(geodata_path=None, options=None):
+    """
+    Render the village map.
+
+    Falls back to the simplified map when there is no geodata yet or the
+    detailed render fails.
+
+    Args:
+        geodata_path (str): ADM1 GeoJSON file, or None for the simplified map
+        options (dict): Optional bbox, statuses, state, width/height (pixels),
+            dpi and format ("png", "webp" or "svg")
+
+    Returns:
+        bytes: Encoded image
+    """
+    options = options or {}
+    villages = _worker["villages"]
+    mask = village_mask(villages, options.get("statuses"), options.get("state"), options.get("bbox"))
+    if geodata_path and os.path.exists(geodata_path):
+        try:
+            return _render_optimized_map(_load_states(geodata_path), villages, mask, options)
+        except Exception as e:
+            print("Map generation error:", e)
+    return _render_simple_map(villages, mask, options)
+
+
+def _figsize(options, default, dpi):
+    """Figure size in inches for the requested pixel size, keeping the default aspect."""
+    width, height = options.get("width"), options.get("height")
+    if width and height:
+        return width / dpi, height / dpi
+    if width:
+        return width / dpi, width / dpi * default[1] / default[0]
+    if height:
+        return height / dpi * default[0] / default[1], height / dpi
+    return default
+
+
+def _encode(fig, options, dpi, **kwargs):
+    """Save fig; cropped to its contents unless a pixel size was requested."""
+    if options.get("width") or options.get("height"):
+        # A tight bbox crops or grows the canvas, so the size would not hold.
+        kwargs.pop("pad_inches", None)
+    else:
+        kwargs["bbox_inches"] = 'tight'
+    buf = io.BytesIO()
+    fig.savefig(buf, format=options.get("format", "png"), dpi=dpi, **kwargs)
+    _pyplot().close(fig)
+    return buf.getvalue()
+
+
+def _render_simple_map(villages, mask, options):
+    plt = _pyplot()
+    dpi = options.get("dpi") or 80
+    fig, ax = plt.subplots(figsize=_figsize(options, (10, 8), dpi))
+
+    lon, lat = villages["lon"][mask], villages["lat"][mask]
+    status, names = villages["status"][mask], villages["name"][mask]
+
+    for value in np.unique(status):
+        selected = status == value
+        ax.scatter(lon[selected], lat[selected], c=STATUS_COLORS.get(value, '#888888'), s=100, alpha=0.8)
+
+    for i, label_y in zip(*place_labels(lon, lat, status_priority(status))):
+        ax.text(lon[i], label_y, names[i],
+                fontsize=8, ha='center', va='bottom', color='#E0E0E0',
+                bbox=dict(boxstyle="round,pad=0.2", fc="#1A1A1A", ec="#E0E0E0", lw=0.5))
+
+    bbox = options.get("bbox")
+    if bbox:
+        ax.set_xlim(bbox[0], bbox[2])
+        ax.set_ylim(bbox[1], bbox[3])
+    elif options.get("state") and mask.any():
+        ax.set_xlim(lon.min() - 1, lon.max() + 1)
+        ax.set_ylim(lat.min() - 1, lat.max() + 1)
+    else:
+        ax.set_xlim(68, 98)
+        ax.set_ylim(8, 36)
+    ax.set_title(f'Village Impact Across {options.get("state") or "India"} (Simplified)', fontsize=16, color='#E0E0E0')
+    ax.set_facecolor('#1A1A1A')
+    ax.set_axis_off()
+    fig.patch.set_facecolor('#1A1A1A')
+
+    shown = options.get("statuses") or list(STATUS_COLORS)
+    handles = [plt.scatter([], [], c=STATUS_COLORS[status], s=100, label=status) for status in shown]
+    ax.legend(handles=handles, facecolor='#1A1A1A', edgecolor='#E0E0E0', labelcolor='#E0E0E0')
+
+    return _encode(fig, options, dpi)
+
+
+def _render_optimized_map(india_states, villages, mask, options):
+    plt, gpd = _pyplot(), lazy_import("geopandas")
+    gridspec = lazy_import("matplotlib.gridspec")
+    dpi = options.get("dpi") or 100
+    # Jitter the full set before filtering so a village sits in the same
+    # spot in every view of the map.
+    lat, lon = jitter_duplicates(villages["lat"], villages["lon"])
+    lat, lon = lat[mask], lon[mask]
+    status, names = villages["status"][mask], villages["name"][mask]
+
+    state = options.get("state")
+    if state:
+        india_states = india_states[india_states["shapeName"].str.lower() == state.lower()]
+
+    gdf = gpd.GeoDataFrame(
+        {"name": names, "status": status, "state": villages["state"][mask],
+         "lat": lat, "lon": lon},
+        geometry=gpd.points_from_xy(lon, lat),
+        crs="EPSG:4326"
+    )
+
+    label_idx, label_ys = place_labels(lon, lat, status_priority(status))
+
+    fig = plt.figure(figsize=_figsize(options, (13, 8), dpi))
+    gs = gridspec.GridSpec(1, 2, width_ratios=[0.6, 3.4])
+    info_ax = fig.add_subplot(gs[0])
+    map_ax = fig.add_subplot(gs[1])
+
+    # Only the labelled villages get a line in the side panel, so it stays
+    # readable no matter how many villages are plotted.
+    info_rows = len(label_idx)
+    info_ax.set_facecolor('#1A1A1A')
+    info_ax.set_xlim(0, 1)
+    info_ax.set_ylim(0, info_rows + 2)
+    info_ax.axis('off')
+    info_ax.text(0.05, info_rows + 0.8, "Village Info", fontsize=12, color="#00FFB3", weight='bold')
+
+    for idx, row in enumerate(gdf.iloc[label_idx].itertuples()):
+        info_ax.text(
+            0.05,
+            info_rows - idx + 0.3,
+            f"{row.name}: ({row.lat:.2f}, {row.lon:.2f})",
+            fontsize=9,
+            color="#E0E0E0",
+            verticalalignment='center'
+        )
+
+    if not india_states.empty:
+        india_states.plot(ax=map_ax, color='#2A2A2A', edgecolor='#555555', linewidth=0.5)
+
+    for value, col in STATUS_COLORS.items():
+        selected = status == value
+        if selected.any():
+            map_ax.scatter(lon[selected], lat[selected], marker='o', c=col, s=50, label=value)
+
+    for i, label_y in zip(label_idx, label_ys):
+        map_ax.text(
+            lon[i],
+            label_y,
+            names[i],
+            fontsize=8,
+            color='#E0E0E0',
+            ha='center',
+            va='bottom',
+            bbox=dict(boxstyle="round,pad=0.2", fc="#1A1A1A", ec="#E0E0E0", lw=0.5)
+        )
+
+    bbox = options.get("bbox")
+    if bbox:
+        map_ax.set_xlim(bbox[0], bbox[2])
+        map_ax.set_ylim(bbox[1], bbox[3])
+
+    map_ax.set_title(f'Village Impact Across {state or "India"}', color='#E0E0E0', fontsize=16)
+    map_ax.set_axis_off()
+    fig.patch.set_facecolor('#1A1A1A')
+    map_ax.set_facecolor('#1A1A1A')
+    if len(status):
+        map_ax.legend(facecolor='#1A1A1A', edgecolor='#E0E0E0', labelcolor='#E0E0E0')
+
+    return _encode(fig, options, dpi, pad_inches=0.3)
+
+
+# ============================================================================
+# TILES
+# ============================================================================
+
+def lonlat_to_mercator(lon, lat):
+    """Project degrees to Web Mercator metres (EPSG:3857)."""
+    lon = np.asarray(lon, dtype=float)
+    lat = np.clip(np.asarray(lat, dtype=float), -85.0511, 85.0511)
+    x = lon * MERCATOR_HALF / 180.0
+    y = np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) * MERCATOR_HALF / np.pi
+    return x, y
+
+
+def tile_bounds(z, x, y):
+    """
+    Web Mercator bounds of a slippy-map tile.
+
+    Returns:
+        tuple: (min_x, min_y, max_x, max_y) in metres
+    """
+    size = 2 * MERCATOR_HALF / (1 << z)
+    min_x = -MERCATOR_HALF + x * size
+    max_y = MERCATOR_HALF - y * size
+    return min_x, max_y - size, min_x + size, max_y
+
+
+def tile_range(bounds, z):
+    """
+    Range of tiles at zoom z that overlap a lon/lat bounding box.
+
+    Args:
+        bounds (dict): min_lon/min_lat/max_lon/max_lat, like INDIA_BOUNDS
+        z (int): Zoom level
+
+    Returns:
+        tuple: (first_x, last_x, first_y, last_y), inclusive
+    """
+    n = 1 << z
+    size = 2 * MERCATOR_HALF / n
+    (x0, x1), (y0, y1) = lonlat_to_mercator(
+        [bounds["min_lon"], bounds["max_lon"]], [bounds["max_lat"], bounds["min_lat"]])
+    return (max(int((x0 + MERCATOR_HALF) // size), 0), min(int((x1 + MERCATOR_HALF) // size), n - 1),
+            max(int((MERCATOR_HALF - y0) // size), 0), min(int((MERCATOR_HALF - y1) // size), n - 1))
+
+
+def render_tile(geodata_path, z, x, y, fmt="png"):
+    """
+    Render one tile of state boundaries and villages.
+
+    Args:
+        geodata_path (str): ADM1 GeoJSON file, or None for villages only
+        z, x, y (int): Tile address
+        fmt (str): "png" for a raster tile, "mvt" for a Mapbox Vector Tile
+
+    Returns:
+        bytes: Encoded tile
+    """
+    bounds = tile_bounds(z, x, y)
+    min_x, min_y, max_x, max_y = bounds
+    # Pad the query so markers and outlines straddling the edge are drawn.
+    pad = (max_x - min_x) * 0.05
+
+    states = None
+    if geodata_path and os.path.exists(geodata_path):
+        states = _load_states_mercator(geodata_path).cx[min_x - pad:max_x + pad, min_y - pad:max_y + pad]
+
+    vx, vy = _villages_mercator()
+    inside = (vx >= min_x - pad) & (vx <= max_x + pad) & (vy >= min_y - pad) & (vy <= max_y + pad)
+
+    if fmt == "mvt":
+        return _encode_vector_tile(bounds, states, inside)
+
+    plt = _pyplot()
+    fig = plt.figure(figsize=(1, 1), dpi=TILE_SIZE)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_xlim(min_x, max_x)
+    ax.set_ylim(min_y, max_y)
+    ax.set_axis_off()
+    fig.patch.set_facecolor('#1A1A1A')
+
+    if states is not None and not states.empty:
+        states.plot(ax=ax, color='#2A2A2A', edgecolor='#555555', linewidth=0.5)
+
+    villages = _worker["villages"]
+    status = villages["status"][inside]
+    for value, col in STATUS_COLORS.items():
+        selected = status == value
+        if selected.any():
+            ax.scatter(vx[inside][selected], vy[inside][selected], c=col, s=4 + 2 * z, linewidths=0)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=TILE_SIZE, facecolor=fig.get_facecolor())
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def _encode_vector_tile(bounds, states, inside):
+    import mapbox_vector_tile
+    from shapely.geometry import box, Point
+
+    tile_box = box(*bounds)
+    state_features = []
+    if states is not None:
+        for name, geom in zip(states["shapeName"], states.geometry):
+            clipped = geom.intersection(tile_box)
+            if not clipped.is_empty:
+                state_features.append({"geometry": clipped, "properties": {"name": name}})
+
+    villages = _worker["villages"]
+    vx, vy = _villages_mercator()
+    village_features = [
+        {"geometry": Point(px, py), "properties": {"name": name, "status": status, "state": state}}
+        for px, py, name, status, state in zip(
+            vx[inside], vy[inside], villages["name"][inside], villages["status"][inside], villages["state"][inside])
+    ]
+
+    return mapbox_vector_tile.encode(
+        [{"name": "states", "features": state_features},
+         {"name": "villages", "features": village_features}],
+        default_options={"quantize_bounds": bounds},
+    )
+
+
+# ============================================================================
+# RENDER POOL
+# ============================================================================
+
+class RenderPool:
+    """
+    Process pool for map renders.
+
+    Finished images are kept in an LRU of cache_size entries, keyed by the
+    request and tagged with the data version they were rendered from.
+    Identical requests share one in-flight render, at most max_pending
+    distinct renders are queued, and a caller that waits longer than timeout
+    gets the cached image for the same key even if its version is stale.
+    Workers get their data once, through initializer(*initargs); restart()
+    hands them new data.
+    """
+
+    def __init__(self, workers=2, max_pending=8, timeout=20, cache_size=64, initializer=None, initargs=()):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self._initializer = initializer
+        self._initargs = initargs
+        self._executor = None
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._images = OrderedDict()
+        self._generation = 0
+
+    def _pool(self):
+        # Spawned (not forked) workers: the parent runs request threads, and
+        # forking a threaded process can leave locks held in the child.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=self._initializer,
+                initargs=self._initargs,
+            )
+        return self._executor
+
+    def start(self):
+        """Start every worker now instead of on the first render."""
+        with self._lock:
+            pool = self._pool()
+            for _ in range(self.workers):
+                pool.submit(ping)
+
+    def restart(self, initargs):
+        """
+        Replace the workers with ones initialised from initargs, and drop the
+        images rendered from the old data. Renders already queued finish on
+        the old workers for their callers but are not cached.
+        """
+        with self._lock:
+            self._initargs = initargs
+            self._generation += 1
+            self._inflight.clear()
+            self._images.clear()
+            if self._executor is None:
+                return
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            pool = self._pool()
+            for _ in range(self.workers):
+                pool.submit(ping)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def cached(self, key, version=None):
+        """
+        Cached image for key, or None if missing or rendered from another version.
+        """
+        with self._lock:
+            entry = self._images.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._images.move_to_end(key)
+            return entry[1]
+
+    def submit(self, key, version, fn, *args, remember=True):
+        """
+        Queue fn(*args) unless the same render is already in flight.
+
+        Args:
+            remember (bool): Keep the result in the image LRU
+
+        Returns:
+            Future or None: None when the queue is full
+        """
+        job = (key, version)
+        with self._lock:
+            future = self._inflight.get(job)
+            if future is not None:
+                return future
+            if len(self._inflight) >= self.max_pending:
+                return None
+            try:
+                future = self._pool().submit(fn, *args)
+            except BrokenProcessPool:
+                self._executor = None
+                future = self._pool().submit(fn, *args)
+            self._inflight[job] = future
+            generation = self._generation
+        future.add_done_callback(lambda f: self._finish(job, f, remember, generation))
+        return future
+
+    def _finish(self, job, future, remember, generation):
+        key, version = job
+        with self._lock:
+            if self._inflight.get(job) is future:
+                del self._inflight[job]
+            if remember and generation == self._generation and not future.cancelled() and future.exception() is None:
+                self._images[key] = (version, future.result())
+                self._images.move_to_end(key)
+                while len(self._images) > self.cache_size:
+                    self._images.popitem(last=False)
+
+    def render(self, key, version, fn, *args):
+        """
+        Cached image for (key, version), else render through the pool.
+
+        Args:
+            key (hashable): Identifies identical requests
+            version (hashable): Version of the data the image depends on
+            fn (callable): Module-level render function (must be picklable)
+
+        Returns:
+            bytes or None: Fresh image, last good image for key, or None
+        """
+        image = self.cached(key, version)
+        if image is not None:
+            return image
+
+        future = self.submit(key, version, fn, *args)
+        if future is not None:
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeout:
+                print(f"Map render timed out after {self.timeout}s, serving last good image")
+            except Exception as e:
+                print("Map render failed:", e)
+        with self._lock:
+            entry = self._images.get(key)
+        return entry[1] if entry else None
+
+    @property
+    def pending(self):
+        return len(self._inflight)
@@ -0,0 +1,212 @@
+"""
+Metrics
+=======
+
+In-process counters and histograms, served in the Prometheus text format
+on /metrics.
+
+- describe: Declare a metric's type and help text
+- inc: Add to a counter
+- observe: Record a value (usually seconds) in a histogram
+- timed: Context manager observing how long a block takes
+- json_io: Count the bytes and time of one JSON file read or write
+- register_collector: Add a callback sampled at scrape time (gauges)
+- InstrumentedExecutor: ThreadPoolExecutor reporting queue depth and task wait
+- render: Every metric in the Prometheus text exposition format
+
+Recording costs one lock acquisition and a bisect, so it can sit on every
+request. Values are per process, like /lock-stats: under gunicorn each
+scrape is answered by whichever worker takes it.
+"""
+
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Seconds; suits request latencies from sub-millisecond counter reads to
+# multi-second map renders.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_lock = threading.Lock()
+_meta = {}        # name -> (type, help, buckets)
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [count per bucket..., count above the last, sum]
+_collectors = []
+
+
+def describe(name, kind, text, buckets=DEFAULT_BUCKETS):
+    """
+    Declare a metric. Undeclared metrics still work, as untyped counters or
+    histograms with DEFAULT_BUCKETS.
+
+    Args:
+        name (str): Metric name
+        kind (str): "counter", "gauge" or "histogram"
+        text (str): HELP text
+        buckets (tuple): Upper bounds, for histograms
+    """
+    _meta[name] = (kind, text, tuple(buckets))
+
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """Add value to the counter name{labels}."""
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    """Record value in the histogram name{labels}."""
+    buckets = _meta.get(name, (None, None, DEFAULT_BUCKETS))[2]
+    slot = bisect_left(buckets, value)
+    key = (name, _labels(labels))
+    with _lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            entry = _histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        entry[slot] += 1
+        entry[-1] += value
+
+
+@contextmanager
+def timed(name, **labels):
+    """
+    Observe the duration of the block in seconds.
+
+    Usage:
+        with timed("geodata_fetch_duration_seconds"):
+            fetch()
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def json_io(operation, path, nbytes, seconds):
+    """Record one JSON file "read" or "write" of nbytes taking seconds."""
+    inc(f"json_{operation}_bytes_total", nbytes, file=path)
+    observe(f"json_{operation}_duration_seconds", seconds, file=path)
+
+
+def register_collector(collector):
+    """
+    Sample collector() on every scrape.
+
+    Args:
+        collector (callable): Returns an iterable of (name, labels dict, value)
+    """
+    _collectors.append(collector)
+
+
+class InstrumentedExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor that reports its queue depth and, per task, how long
+    it waited for a thread and how long it ran.
+    """
+
+    def __init__(self, max_workers=None, name="executor", **kwargs):
+        kwargs.setdefault("thread_name_prefix", name)
+        super().__init__(max_workers=max_workers, **kwargs)
+        self.name = name
+        register_collector(self._collect)
+
+    def submit(self, fn, /, *args, **kwargs):
+        queued = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            observe("executor_task_wait_seconds", started - queued, executor=self.name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe("executor_task_duration_seconds", time.perf_counter() - started, executor=self.name)
+
+        return super().submit(run)
+
+    def _collect(self):
+        # _work_queue holds the submitted tasks no thread has picked up yet.
+        yield "executor_queue_depth", {"executor": self.name}, self._work_queue.qsize()
+
+
+# ============================================================================
+# EXPOSITION
+# ============================================================================
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def _sample(name, labels, value):
+    number = repr(float(value)) if isinstance(value, float) else str(value)
+    if number == "inf":
+        number = "+Inf"
+    if not labels:
+        return f"{name} {number}"
+    pairs = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+    return f"{name}{{{pairs}}} {number}"
+
+
+def render():
+    """
+    Every metric in the Prometheus text exposition format.
+
+    Returns:
+        str: Serve with CONTENT_TYPE
+    """
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(entry) for key, entry in _histograms.items()}
+
+    families = {}
+    for (name, labels), value in counters.items():
+        families.setdefault(name, []).append(_sample(name, labels, value))
+
+    for (name, labels), entry in histograms.items():
+        buckets = _meta.get(name, (None, None, DEFAULT_BUCKETS))[2]
+        lines = families.setdefault(name, [])
+        total = 0
+        for bound, count in zip(buckets + (float("inf"),), entry[:-1]):
+            total += count
+            lines.append(_sample(f"{name}_bucket", labels + (("le", _bound(bound)),), total))
+        lines.append(_sample(f"{name}_sum", labels, entry[-1]))
+        lines.append(_sample(f"{name}_count", labels, total))
+
+    for collector in list(_collectors):
+        try:
+            for name, labels, value in collector():
+                families.setdefault(name, []).append(_sample(name, _labels(labels), value))
+        except Exception as e:
+            print(f"Metrics collector {collector!r} failed: {e}")
+
+    out = []
+    for name in sorted(families):
+        kind, text = _meta.get(name, ("untyped", None, None))[:2]
+        if text:
+            out.append(f"# HELP {name} {text}")
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(families[name])
+    return "\n".join(out) + "\n"
+
+
+describe("http_request_duration_seconds", "histogram", "Request latency by route, method and status.")
+describe("executor_queue_depth", "gauge", "Tasks waiting for an executor thread.")
+describe("executor_task_wait_seconds", "histogram", "Time from submit to a thread starting the task.")
+describe("executor_task_duration_seconds", "histogram", "Time spent running executor tasks.")
+describe("json_read_bytes_total", "counter", "Bytes of JSON read, per file.")
+describe("json_write_bytes_total", "counter", "Bytes of JSON written, per file.")
+describe("json_read_duration_seconds", "histogram", "Time to read and parse a JSON file (lock wait excluded).")
+describe("json_write_duration_seconds", "histogram", "Time to serialise and write a JSON file (lock wait excluded).")
@@ -0,0 +1,122 @@
+"""
+Rate Limiting Helpers
+=====================
+
+In-process rate limiting keyed by client (usually the client IP).
+
+- TokenBucketLimiter: Per-key token buckets held in a bounded LRU
+- AdmissionController: Per-client rate limit plus per-route concurrency
+  caps, checked before a request does any work
+"""
+
+import time
+import threading
+from collections import OrderedDict, Counter
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket per key: `burst` requests at once, refilled at `rate` per
+    second. Only the `max_keys` most recently seen keys are remembered, so
+    memory stays bounded however many clients show up; a forgotten key
+    simply starts again with a full bucket.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key, cost=1):
+        """
+        Take `cost` tokens from key's bucket if it has them.
+
+        Returns:
+            tuple: (allowed, seconds until enough tokens are available)
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Admission for a fixed set of routes. A request is shed when its client
+    has used up a token bucket shared by all of those routes, or when
+    `max_concurrent` requests for its route are already in flight in this
+    process. Call enter() before touching any files and leave() once done
+    with every admitted request.
+    """
+
+    def __init__(self, max_concurrent, rate, burst, max_keys=10000):
+        """
+        Args:
+            max_concurrent (dict): {route: requests allowed in flight at once}
+            rate (float): Requests per second each client may sustain
+            burst (int): Requests a client may make at once
+            max_keys (int): Clients remembered by the token buckets
+        """
+        self.max_concurrent = dict(max_concurrent)
+        self.limiter = TokenBucketLimiter(rate, burst, max_keys)
+        self._in_flight = {route: 0 for route in self.max_concurrent}
+        self._shed = Counter()
+        self._admitted = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def routes(self):
+        return self.max_concurrent.keys()
+
+    def enter(self, route, key):
+        """
+        Admit a request for route from client key, or shed it.
+
+        Returns:
+            tuple: (admitted, reason, retry_after) where reason is None,
+            "concurrency" or "rate" and retry_after is in seconds
+        """
+        with self._lock:
+            if self._in_flight[route] >= self.max_concurrent[route]:
+                self._shed[(route, "concurrency")] += 1
+                return False, "concurrency", 1.0
+            self._in_flight[route] += 1
+
+        allowed, retry_after = self.limiter.allow(key)
+        with self._lock:
+            if not allowed:
+                self._in_flight[route] -= 1
+                self._shed[(route, "rate")] += 1
+                return False, "rate", retry_after
+            self._admitted[route] += 1
+        return True, None, 0.0
+
+    def leave(self, route):
+        """Mark an admitted request for route as finished."""
+        with self._lock:
+            self._in_flight[route] -= 1
+
+    def stats(self):
+        """
+        Counters for this process, per route.
+
+        Returns:
+            dict: {route: {"admitted", "in_flight", "max_concurrent",
+            "shed": {"rate", "concurrency"}}}
+        """
+        with self._lock:
+            return {route: {
+                "admitted": self._admitted[route],
+                "in_flight": self._in_flight[route],
+                "max_concurrent": limit,
+                "shed": {reason: self._shed[(route, reason)] for reason in ("rate", "concurrency")},
+            } for route, limit in self.max_concurrent.items()}
@@ -0,0 +1,397 @@
+"""
+Compact Task Records
+====================
+
+Column-wise storage for add_task collections held in memory, converting
+losslessly to and from the JSON layout helpers.json writes.
+
+- TaskRecords: One list of tasks, stored as columns
+  - append / extend: Add tasks
+  - get / set: Read or write one field of one row
+  - find: Row of the first task whose field equals a value
+  - row / to_list: Tasks as plain dicts
+- pack: Replace every task list in a document with TaskRecords
+- unpack: The plain JSON document back from pack's output
+- parse_time / format_time: "HH:MM:SS" <-> seconds since midnight
+
+Rows are not dicts. Each distinct key order (a "shape") is stored once and
+rows refer to it by number. "time" is kept as seconds since midnight in an
+int32 array, each "time_log" as an int32 array, and "no_of_responses" in an
+int64 array. Every other field keeps its strings as UTF-8 in one buffer per
+field, with an offset and length per row, so a value costs its bytes plus
+12 rather than a str object and a dict slot. Values a column cannot hold
+exactly (a number in a text field, a time like "7:05", a float count) are
+kept as they are in the column's overflow map, so unpack(pack(data)) ==
+data, key order included.
+"""
+
+import re
+from array import array
+
+
+# ASCII digits only: int() reads other digits too, but they would not format back.
+TIME_PATTERN = re.compile(r"([01][0-9]|2[0-3]):([0-5][0-9]):([0-5][0-9])")
+# Overwritten string bytes are reclaimed once they are this many and half the buffer.
+COMPACT_MIN_GARBAGE = 64 * 1024
+MISSING = -1
+INT64_RANGE = (-2 ** 63, 2 ** 63)
+
+
+def parse_time(value):
+    """
+    Seconds since midnight of an "HH:MM:SS" string.
+
+    Returns:
+        int or None: None for anything that would not format back identically
+    """
+    if type(value) is str and len(value) == 8:
+        match = TIME_PATTERN.fullmatch(value)
+        if match:
+            hours, minutes, seconds = map(int, match.groups())
+            return hours * 3600 + minutes * 60 + seconds
+    return None
+
+
+def format_time(seconds):
+    """The "HH:MM:SS" string for seconds since midnight."""
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+# ============================================================================
+# COLUMNS
+# ============================================================================
+
+class _StringColumn:
+    __slots__ = ("data", "starts", "lengths", "overflow", "garbage")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.starts = array("Q")
+        self.lengths = array("I")
+        self.overflow = {}
+        self.garbage = 0
+
+    def append(self, value):
+        if type(value) is str:
+            try:
+                encoded = value.encode("utf-8")
+            except UnicodeEncodeError:
+                encoded = None
+            if encoded is not None:
+                self.starts.append(len(self.data))
+                self.lengths.append(len(encoded))
+                self.data += encoded
+                return
+        self.pad()
+        self.overflow[len(self.starts) - 1] = value
+
+    def pad(self):
+        self.starts.append(0)
+        self.lengths.append(0)
+
+    def get(self, row):
+        if self.overflow and row in self.overflow:
+            return self.overflow[row]
+        start = self.starts[row]
+        return self.data[start:start + self.lengths[row]].decode("utf-8")
+
+    def set(self, row, value):
+        encoded = None
+        if type(value) is str:
+            try:
+                encoded = value.encode("utf-8")
+            except UnicodeEncodeError:
+                # Lone surrogates (legal in JSON) have no UTF-8 form.
+                pass
+        old_length = self.lengths[row]
+        if encoded is None:
+            self.overflow[row] = value
+            self.lengths[row] = 0
+            self.garbage += old_length
+            return
+
+        self.overflow.pop(row, None)
+        if len(encoded) <= old_length:
+            # Shorter or equal: overwrite in place.
+            start = self.starts[row]
+            self.garbage += old_length - len(encoded)
+        else:
+            start = len(self.data)
+            self.data += encoded
+            self.garbage += old_length
+        self.data[start:start + len(encoded)] = encoded
+        self.starts[row] = start
+        self.lengths[row] = len(encoded)
+        if self.garbage > COMPACT_MIN_GARBAGE and self.garbage * 2 > len(self.data):
+            self._compact()
+
+    def _compact(self):
+        data = bytearray()
+        for row, (start, length) in enumerate(zip(self.starts, self.lengths)):
+            self.starts[row] = len(data)
+            data += self.data[start:start + length]
+        self.data = data
+        self.garbage = 0
+
+
+class _TimeColumn:
+    __slots__ = ("values", "overflow")
+
+    def __init__(self):
+        self.values = array("i")
+        self.overflow = {}
+
+    def append(self, value):
+        self.values.append(MISSING)
+        self.set(len(self.values) - 1, value)
+
+    def pad(self):
+        self.values.append(MISSING)
+
+    def get(self, row):
+        if self.overflow and row in self.overflow:
+            return self.overflow[row]
+        return format_time(self.values[row])
+
+    def set(self, row, value):
+        seconds = parse_time(value)
+        if seconds is None:
+            self.overflow[row] = value
+            self.values[row] = MISSING
+        else:
+            self.overflow.pop(row, None)
+            self.values[row] = seconds
+
+
+class _TimeLogColumn:
+    __slots__ = ("values", "overflow")
+
+    def __init__(self):
+        self.values = []
+        self.overflow = {}
+
+    def append(self, value):
+        self.values.append(None)
+        self.set(len(self.values) - 1, value)
+
+    def pad(self):
+        self.values.append(None)
+
+    def get(self, row):
+        if self.overflow and row in self.overflow:
+            return self.overflow[row]
+        return [format_time(seconds) for seconds in self.values[row]]
+
+    def set(self, row, value):
+        seconds = [parse_time(item) for item in value] if type(value) is list else [None]
+        if None in seconds:
+            self.overflow[row] = value
+            self.values[row] = None
+        else:
+            self.overflow.pop(row, None)
+            self.values[row] = array("i", seconds)
+
+
+class _IntColumn:
+    __slots__ = ("values", "overflow")
+
+    def __init__(self):
+        self.values = array("q")
+        self.overflow = {}
+
+    def append(self, value):
+        self.values.append(0)
+        self.set(len(self.values) - 1, value)
+
+    def pad(self):
+        self.values.append(0)
+
+    def get(self, row):
+        if self.overflow and row in self.overflow:
+            return self.overflow[row]
+        return self.values[row]
+
+    def set(self, row, value):
+        if type(value) is int and INT64_RANGE[0] <= value < INT64_RANGE[1]:
+            self.overflow.pop(row, None)
+            self.values[row] = value
+        else:
+            self.overflow[row] = value
+            self.values[row] = 0
+
+
+# add_task's bookkeeping fields get typed columns; everything else is submitted data.
+TYPED_COLUMNS = {
+    "time": _TimeColumn,
+    "time_log": _TimeLogColumn,
+    "no_of_responses": _IntColumn,
+}
+
+
+# ============================================================================
+# RECORDS
+# ============================================================================
+
+class TaskRecords:
+    """
+    A list of task dicts stored column-wise.
+
+    Usage:
+        records = TaskRecords(data["Donations Made"]["2024-05-01"])
+        row = records.find("name", "Food Kit")
+        records.set(row, "no_of_responses", records.get(row, "no_of_responses", 1) + 1)
+        data["Donations Made"]["2024-05-01"] = records.to_list()
+    """
+
+    __slots__ = ("_shapes", "_shape_ids", "_rows", "_columns", "_strings")
+
+    def __init__(self, tasks=()):
+        self._shapes = []      # distinct key orders, as tuples of field names
+        self._shape_ids = {}   # key order -> index into _shapes
+        self._rows = array("I")  # shape of each row
+        self._columns = {}     # field -> column with one slot per row
+        self._strings = {}     # field names, shared by every shape
+        self.extend(tasks)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        for row in range(len(self._rows)):
+            yield self.row(row)
+
+    def __repr__(self):
+        return f"TaskRecords({len(self)} tasks, fields={list(self._columns)})"
+
+    def _index(self, row):
+        return range(len(self._rows))[row]
+
+    def _shape(self, fields):
+        fields = tuple(fields)
+        shape = self._shape_ids.get(fields)
+        if shape is None:
+            shape = self._shape_ids[fields] = len(self._shapes)
+            self._shapes.append(tuple(self._strings.setdefault(field, field) for field in fields))
+        return shape
+
+    def _column(self, field):
+        column = self._columns.get(field)
+        if column is None:
+            column = TYPED_COLUMNS.get(field, _StringColumn)()
+            for _ in range(len(self._rows)):
+                column.pad()
+            self._columns[self._strings.setdefault(field, field)] = column
+        return column
+
+    def append(self, task):
+        """
+        Add a task.
+
+        Args:
+            task (dict): One task, as stored by add_task
+
+        Returns:
+            int: Its row
+
+        Raises:
+            TypeError: If task is not a dict
+        """
+        if not isinstance(task, dict):
+            raise TypeError(f"Tasks must be dicts, not {type(task).__name__}")
+        for field in task:
+            self._column(field)
+        for field, column in self._columns.items():
+            if field in task:
+                column.append(task[field])
+            else:
+                column.pad()
+        self._rows.append(self._shape(task))
+        return len(self._rows) - 1
+
+    def extend(self, tasks):
+        for task in tasks:
+            self.append(task)
+
+    def get(self, row, field, default=None):
+        """Value of field in a row, default if the task has no such field."""
+        row = self._index(row)
+        if field not in self._shapes[self._rows[row]]:
+            return default
+        return self._columns[field].get(row)
+
+    def set(self, row, field, value):
+        """Set field in a row; a new field goes last, as it would in a dict."""
+        row = self._index(row)
+        shape = self._shapes[self._rows[row]]
+        if field not in shape:
+            self._rows[row] = self._shape(shape + (field,))
+        self._column(field).set(row, value)
+
+    def find(self, field, value):
+        """
+        Row of the first task whose field equals value.
+
+        Returns:
+            int or None: None if no task matches
+        """
+        if field not in self._columns:
+            return None
+        column = self._columns[field]
+        for row in range(len(self._rows)):
+            # Rows without the field hold padding, which need not read back.
+            if field in self._shapes[self._rows[row]] and column.get(row) == value:
+                return row
+        return None
+
+    def row(self, row):
+        """The task at a row, as a new dict."""
+        row = self._index(row)
+        return {field: self._columns[field].get(row) for field in self._shapes[self._rows[row]]}
+
+    def to_list(self):
+        """Every task as a plain dict, in order."""
+        return list(self)
+
+
+def _is_task_list(value):
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+
+
+def pack(data):
+    """
+    A copy of a document with its task lists as TaskRecords: top-level
+    lists of dicts, and lists of dicts one level down (date groups).
+
+    Args:
+        data (dict): Document as read from a helpers.json store
+
+    Returns:
+        dict: Same keys; other values are shared with data, not copied
+    """
+    packed = {}
+    for key, value in data.items():
+        if _is_task_list(value):
+            value = TaskRecords(value)
+        elif isinstance(value, dict):
+            value = {group: TaskRecords(tasks) if _is_task_list(tasks) else tasks
+                     for group, tasks in value.items()}
+        packed[key] = value
+    return packed
+
+
+def unpack(packed):
+    """
+    The plain JSON document for pack's output.
+
+    Returns:
+        dict: Equal to the document that was packed, key order included
+    """
+    data = {}
+    for key, value in packed.items():
+        if isinstance(value, TaskRecords):
+            value = value.to_list()
+        elif isinstance(value, dict):
+            value = {group: tasks.to_list() if isinstance(tasks, TaskRecords) else tasks
+                     for group, tasks in value.items()}
+        data[key] = value
+    return data
@@ -0,0 +1,157 @@
+"""
+Counter Rollups
+===============
+
+Time series for event counters (tab clicks, AI usage) in fixed-size ring
+buffers, so storage stays the same size however much traffic arrives.
+
+- RollupStore: Per-name minute/hour/day buckets in a memory-mapped file
+  - record: Count events for a name
+  - series: Recent buckets of one name at one resolution
+  - names: Names with a series
+
+Each event is added to the current bucket of every resolution, and each
+resolution keeps only its last `slots` buckets: by default a day of
+minutes, 30 days of hours and two years of days. A slot remembers which
+bucket it holds, so a slot left over from an older lap of the ring reads
+as zero. When every series is taken, a new name replaces the series that
+was updated longest ago.
+"""
+
+import os
+import time
+import threading
+
+import numpy as np
+
+from helpers.locks import read_lock, write_lock
+
+
+# (name, bucket width in seconds, buckets kept)
+RESOLUTIONS = (
+    ("minute", 60, 24 * 60),
+    ("hour", 3600, 30 * 24),
+    ("day", 86400, 2 * 365),
+)
+NAME_BYTES = 64
+
+
+def _key(name):
+    """
+    Stored form of a name: UTF-8, cut to NAME_BYTES on a character boundary
+    so that names() gives back a name that finds the same series.
+    """
+    encoded = name.encode("utf-8", "replace")
+    if len(encoded) <= NAME_BYTES:
+        return encoded
+    return encoded[:NAME_BYTES].decode("utf-8", "ignore").encode("utf-8")
+
+
+class RollupStore:
+    """
+    Ring-buffered counters for the `max_series` most recently updated names,
+    kept in one file that every worker process maps and updates under the
+    file's lock.
+    """
+
+    def __init__(self, path, max_series=64, resolutions=RESOLUTIONS):
+        self.path = path
+        self.max_series = max_series
+        self.resolutions = {name: (width, slots) for name, width, slots in resolutions}
+        fields = [("name", f"S{NAME_BYTES}"), ("updated", "<f8")]
+        for name, width, slots in resolutions:
+            fields += [(f"{name}_bucket", "<i8", (slots,)), (f"{name}_count", "<i8", (slots,))]
+        self.dtype = np.dtype(fields)
+        self._index = {}
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _map(self):
+        """The mapped series table, creating (or resizing) the file on first use."""
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    size = self.dtype.itemsize * self.max_series
+                    with write_lock(self.path):
+                        if not os.path.exists(self.path) or os.path.getsize(self.path) != size:
+                            with open(self.path, "wb") as f:
+                                f.truncate(size)
+                    self._data = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=(self.max_series,))
+        return self._data
+
+    def _row(self, name, create):
+        """
+        Row of a name, adding it if asked; None if absent. Caller holds the file lock.
+
+        A new name takes a free row, or else the least recently updated one.
+        Another process may have given a cached row to another name since,
+        so the cache is checked against the file.
+        """
+        data = self._map()
+        key = _key(name)
+        row = self._index.get(name)
+        if row is not None and data["name"][row] == key:
+            return row
+        names = data["name"]
+        found = np.flatnonzero(names == key)
+        if len(found):
+            row = int(found[0])
+        elif not create:
+            self._index.pop(name, None)
+            return None
+        else:
+            free = np.flatnonzero(names == b"")
+            row = int(free[0]) if len(free) else int(np.argmin(data["updated"]))
+            data[row] = np.zeros((), dtype=self.dtype)
+            data["name"][row] = key
+        self._index[name] = row
+        return row
+
+    def record(self, name, count=1, at=None):
+        """Add count events for name at epoch time `at` (default now)."""
+        at = time.time() if at is None else at
+        data = self._map()
+        with write_lock(self.path):
+            row = self._row(name, create=True)
+            data["updated"][row] = time.time()
+            for resolution, (width, slots) in self.resolutions.items():
+                bucket = int(at // width)
+                slot = bucket % slots
+                buckets, counts = data[f"{resolution}_bucket"][row], data[f"{resolution}_count"][row]
+                if buckets[slot] != bucket:
+                    buckets[slot] = bucket
+                    counts[slot] = 0
+                counts[slot] += count
+
+    def series(self, name, resolution="hour", points=None, now=None):
+        """
+        The last `points` buckets of a name (default: all retained).
+
+        Returns:
+            list: [[bucket start epoch seconds, count], ...] oldest first,
+            zero-filled; None if the name has no series
+
+        Raises:
+            KeyError: For an unknown resolution
+        """
+        width, slots = self.resolutions[resolution]
+        points = slots if points is None else max(1, min(points, slots))
+        now = time.time() if now is None else now
+        data = self._map()
+        with read_lock(self.path):
+            row = self._row(name, create=False)
+            if row is None:
+                return None
+            buckets = np.array(data[f"{resolution}_bucket"][row])
+            counts = np.array(data[f"{resolution}_count"][row])
+
+        wanted = np.arange(int(now // width) - points + 1, int(now // width) + 1)
+        slot = wanted % slots
+        values = np.where(buckets[slot] == wanted, counts[slot], 0)
+        return [[int(b * width), int(n)] for b, n in zip(wanted, values)]
+
+    def names(self):
+        """Names that have a series, in no particular order."""
+        data = self._map()
+        with read_lock(self.path):
+            return [n.decode("utf-8", "replace") for n in data["name"] if n]
@@ -0,0 +1,90 @@
+"""
+Shared State
+============
+
+State shared by every worker process of a multi-process server (see
+gunicorn.conf.py). Caches and one-off job claims go through here so
+workers do not diverge; file writes are coordinated by helpers/locks.py.
+
+- SharedState: SQLite-backed key/value store with expiry and atomic claims
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+class SharedState:
+    """
+    Key/value store in one SQLite file, safe to use from any thread of any
+    process on the machine.
+
+    Values are stored as JSON. Entries may carry a time-to-live; expired
+    entries read as missing and are purged every `purge_every` writes.
+    Each thread (and each forked process) opens its own connection.
+    """
+
+    def __init__(self, path, timeout=10, purge_every=500):
+        self.path = path
+        self.timeout = timeout
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _expiry(self, ttl):
+        return time.time() + ttl if ttl else None
+
+    def get(self, key, default=None):
+        """Value stored under key, or default if missing or expired."""
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time())).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key, value, ttl=None):
+        """Store value under key, replacing any previous value."""
+        self._conn().execute(
+            "INSERT INTO kv (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires",
+            (key, json.dumps(value), self._expiry(ttl)))
+        self._maybe_purge()
+
+    def claim(self, key, ttl, value=None):
+        """
+        Atomically take key if nobody holds it (or the holder's claim expired).
+
+        Used so that a job runs in one worker only; the ttl frees the claim
+        if its holder dies without calling release().
+
+        Returns:
+            bool: True if this caller now holds the claim
+        """
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO kv (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+            "WHERE kv.expires IS NOT NULL AND kv.expires <= ?",
+            (key, json.dumps(value if value is not None else os.getpid()), now + ttl, now))
+        return cur.rowcount == 1
+
+    def release(self, key):
+        """Drop key (ends a claim early)."""
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def _maybe_purge(self):
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            self._conn().execute("DELETE FROM kv WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+
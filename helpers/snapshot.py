@@ -0,0 +1,217 @@
+"""
+JSON Snapshots
+==============
+
+Compact binary summaries written next to each JSON store ("<file>.snap"),
+so read-only queries can memory-map a few arrays instead of parsing the
+whole file. The OS page cache holds one copy shared by every worker.
+
+Writing:
+- write_snapshot: Summarise a JSON document the writer already has in memory
+
+Reading:
+- load_snapshot: Mapped snapshot of a JSON file, None if missing or stale
+- Snapshot: keys, flat_keys, counters, list_length, last_seen
+
+Layout: a header (magic, version, section count, the JSON file's mtime_ns
+and size), a table of named sections (numpy dtype, offset, item count),
+then the 8-byte aligned section data. String columns are stored as a uint64
+offsets section plus a utf-8 data section.
+"""
+
+import os
+import mmap
+import struct
+import datetime
+import threading
+
+import numpy as np
+
+
+MAGIC = b"DBSNAP01"
+VERSION = 1
+HEADER = struct.Struct("<8sIIqq")
+SECTION = struct.Struct("<24s4sQQ")
+
+# Kinds of top-level values, stored per key.
+KIND_OTHER, KIND_INT, KIND_FLOAT, KIND_LIST = 0, 1, 2, 3
+
+_open = {}
+_open_lock = threading.Lock()
+
+
+def snapshot_path(json_path):
+    return f"{json_path}.snap"
+
+
+def _flat_keys(data, parent_key="", sep="."):
+    """Keys of helpers.json.flatten_json(data), without building the values."""
+    keys = []
+    for k, v in data.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        if isinstance(v, dict):
+            keys.extend(_flat_keys(v, new_key, sep))
+        else:
+            keys.append(new_key)
+    return keys
+
+
+def _timestamp(value):
+    """ISO timestamp (naive means UTC) as epoch seconds, NaN if unparseable."""
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return np.nan
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+def _string_sections(name, strings):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(s) for s in encoded], out=offsets[1:])
+    return [(f"{name}.offsets", offsets), (f"{name}.data", np.frombuffer(b"".join(encoded), dtype="u1"))]
+
+
+def write_snapshot(json_path, data):
+    """
+    Write the snapshot for a JSON file that was just written with `data`.
+
+    Must run while the writer still holds the file's write lock, after the
+    JSON is in place: the snapshot records the JSON's mtime and size, and
+    readers ignore it once those no longer match.
+
+    Args:
+        json_path (str): The JSON file
+        data: The document written to it (non-dict documents get no snapshot)
+    """
+    path = snapshot_path(json_path)
+    if not isinstance(data, dict):
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    keys = [str(k) for k in data]
+    kinds = np.zeros(len(keys), dtype="u1")
+    values = np.full(len(keys), np.nan, dtype="<f8")
+    lengths = np.full(len(keys), -1, dtype="<i8")
+    for i, value in enumerate(data.values()):
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, int):
+            kinds[i], values[i] = KIND_INT, value
+        elif isinstance(value, float):
+            kinds[i], values[i] = KIND_FLOAT, value
+        elif isinstance(value, list):
+            kinds[i], lengths[i] = KIND_LIST, len(value)
+
+    sections = _string_sections("keys", keys) + _string_sections("flat_keys", _flat_keys(data)) + [
+        ("kinds", kinds), ("values", values), ("lengths", lengths)]
+    users = data.get("users")
+    if isinstance(users, list):
+        last_seen = [_timestamp(u.get("last_seen")) if isinstance(u, dict) else np.nan for u in users]
+        sections.append(("last_seen", np.array(last_seen, dtype="<f8")))
+
+    offset = HEADER.size + SECTION.size * len(sections)
+    table, blobs = [], []
+    for name, array in sections:
+        offset += -offset % 8
+        table.append(SECTION.pack(name.encode(), array.dtype.str.encode(), offset, len(array)))
+        blobs.append((offset, array.tobytes()))
+        offset += array.nbytes
+
+    stat = os.stat(json_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(sections), stat.st_mtime_ns, stat.st_size))
+        f.write(b"".join(table))
+        for start, blob in blobs:
+            f.write(b"\0" * (start - f.tell()))
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """
+    Read-only view of a mapped snapshot file. Arrays returned are views of
+    the mapping, not copies.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, self.source_mtime_ns, self.source_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} snapshot")
+        self._sections = {}
+        for i in range(count):
+            name, dtype, offset, length = SECTION.unpack_from(self._map, HEADER.size + i * SECTION.size)
+            self._sections[name.rstrip(b"\0").decode()] = (dtype.rstrip(b"\0").decode(), offset, length)
+
+    def column(self, name):
+        """Section as a numpy array, None if the snapshot has no such section."""
+        if name not in self._sections:
+            return None
+        dtype, offset, length = self._sections[name]
+        return np.frombuffer(self._map, dtype=dtype, count=length, offset=offset)
+
+    def strings(self, name):
+        offsets, data = self.column(f"{name}.offsets"), self.column(f"{name}.data")
+        raw = data.tobytes()
+        return [raw[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+    def keys(self):
+        """Top-level keys, in document order."""
+        return self.strings("keys")
+
+    def flat_keys(self):
+        """Keys of flatten_json(document)."""
+        return self.strings("flat_keys")
+
+    def counters(self):
+        """Top-level numeric values as {key: number}."""
+        kinds, values = self.column("kinds"), self.column("values")
+        return {key: int(value) if kind == KIND_INT else float(value)
+                for key, kind, value in zip(self.keys(), kinds, values)
+                if kind in (KIND_INT, KIND_FLOAT)}
+
+    def list_length(self, key):
+        """Length of the list under a top-level key, 0 if missing or not a list."""
+        keys = self.keys()
+        if key not in keys:
+            return 0
+        return max(int(self.column("lengths")[keys.index(key)]), 0)
+
+    def last_seen(self):
+        """Epoch seconds of each users[] entry's last_seen (NaN if invalid), or None."""
+        return self.column("last_seen")
+
+
+def load_snapshot(json_path):
+    """
+    Mapped snapshot of a JSON file, reused while the file is unchanged.
+
+    Returns:
+        Snapshot or None: None if there is no snapshot or the JSON has
+        changed since it was written (the caller then parses the JSON)
+    """
+    path = snapshot_path(json_path)
+    try:
+        source = os.stat(json_path)
+        snap_stat = os.stat(path)
+    except OSError:
+        return None
+
+    version = (snap_stat.st_ino, snap_stat.st_mtime_ns)
+    with _open_lock:
+        entry = _open.get(path)
+        if entry is None or entry[0] != version:
+            try:
+                entry = _open[path] = (version, Snapshot(path))
+            except (OSError, ValueError, struct.error):
+                return None
+    snapshot = entry[1]
+    if (snapshot.source_mtime_ns, snapshot.source_size) != (source.st_mtime_ns, source.st_size):
+        return None
+    return snapshot
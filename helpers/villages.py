@@ -0,0 +1,265 @@
+"""
+Village Store
+=============
+
+Columnar, indexed in-memory store for the villages shown on the map.
+
+Loading:
+- village_arrays: Column-wise NumPy view of a list of village dicts
+- load_villages: Read village dicts from a JSON file
+
+Querying:
+- VillageStore: Grid spatial index plus state/status indexes
+  - in_bbox, nearest, by_state, select: Index queries returning row indices
+  - records: Turn row indices back into village dicts
+  - set_states: Replace the state column and rebuild its index
+
+Output:
+- stream_geojson: Yield a GeoJSON FeatureCollection in chunks
+"""
+
+import json
+import math
+
+import numpy as np
+
+
+# Cell size of the spatial grid in degrees (~28 km at the equator).
+GRID_CELL = 0.25
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def village_arrays(villages):
+    """
+    Column-wise NumPy view of a list of village dicts.
+
+    Args:
+        villages (list): Dicts with name/status/lat/lon keys and an
+            optional state (blank until geocoded)
+
+    Returns:
+        dict: name/status/state object arrays and float lat/lon arrays
+    """
+    return {
+        "name": np.array([v["name"] for v in villages], dtype=object),
+        "status": np.array([v["status"] for v in villages], dtype=object),
+        "state": np.array([v.get("state", "") for v in villages], dtype=object),
+        "lat": np.array([v["lat"] for v in villages], dtype=float),
+        "lon": np.array([v["lon"] for v in villages], dtype=float),
+    }
+
+
+def load_villages(file_path):
+    """
+    Read villages from a JSON file holding a list of village dicts
+    (or {"villages": [...]}, the /get_map_data shape).
+
+    Args:
+        file_path (str): Path to JSON file
+
+    Returns:
+        list: Village dicts
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data["villages"] if isinstance(data, dict) else data
+
+
+def haversine_km(lat, lon, lat0, lon0):
+    """Great-circle distance in km from (lat0, lon0) to each point."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    lat0, lon0 = math.radians(lat0), math.radians(lon0)
+    a = np.sin((lat - lat0) / 2) ** 2 + math.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def _value_index(values):
+    """Map each distinct value to the sorted row indices holding it."""
+    keys, inverse = np.unique(values.astype(str), return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+    return {key: order[bounds[i]:bounds[i + 1]] for i, key in enumerate(keys)}
+
+
+class VillageStore:
+    """
+    Villages held as NumPy columns with a uniform grid index.
+
+    Rows are bucketed into GRID_CELL-degree cells and sorted by cell id, so
+    the rows of a run of cells in one grid column form a contiguous slice of
+    the sort order (a CSR layout). State and status lookups use per-value
+    row-index arrays; states are matched case-insensitively.
+    """
+
+    def __init__(self, villages, cell=GRID_CELL):
+        self.columns = village_arrays(villages) if isinstance(villages, list) else villages
+        self.cell = cell
+        lat, lon = self.columns["lat"], self.columns["lon"]
+        self.size = len(lat)
+
+        if self.size:
+            self.min_lon, self.min_lat = lon.min(), lat.min()
+            self.max_lon, self.max_lat = lon.max(), lat.max()
+        else:
+            self.min_lon = self.min_lat = self.max_lon = self.max_lat = 0.0
+        self.n_cols = int((self.max_lon - self.min_lon) // cell) + 1
+        self.n_rows = int((self.max_lat - self.min_lat) // cell) + 1
+
+        cell_ids = self._cell_x(lon) * self.n_rows + self._cell_y(lat)
+        self.order = np.argsort(cell_ids, kind="stable")
+        self.sorted_cells = cell_ids[self.order]
+
+        self.set_states(self.columns["state"])
+        self.status_index = _value_index(self.columns["status"])
+
+    def set_states(self, state):
+        """
+        Replace the state column (e.g. after geocoding) and rebuild its index.
+        """
+        self.columns["state"] = np.asarray(state, dtype=object)
+        self.state_index = _value_index(np.char.lower(self.columns["state"].astype(str)))
+
+    def __len__(self):
+        return self.size
+
+    def _cell_x(self, lon):
+        return np.clip(((np.asarray(lon) - self.min_lon) // self.cell).astype(np.int64), 0, self.n_cols - 1)
+
+    def _cell_y(self, lat):
+        return np.clip(((np.asarray(lat) - self.min_lat) // self.cell).astype(np.int64), 0, self.n_rows - 1)
+
+    def _grid_candidates(self, min_lon, min_lat, max_lon, max_lat):
+        """Rows in every grid cell touching the box (a superset of the answer)."""
+        if not self.size or min_lon > self.max_lon or max_lon < self.min_lon \
+                or min_lat > self.max_lat or max_lat < self.min_lat:
+            return np.empty(0, dtype=np.int64)
+        x0, x1 = self._cell_x([min_lon, max_lon])
+        y0, y1 = self._cell_y([min_lat, max_lat])
+        columns = np.arange(x0, x1 + 1) * self.n_rows
+        starts = np.searchsorted(self.sorted_cells, columns + y0, side="left")
+        ends = np.searchsorted(self.sorted_cells, columns + y1, side="right")
+        return np.concatenate([self.order[s:e] for s, e in zip(starts, ends)])
+
+    def in_bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """
+        Rows inside a lon/lat bounding box.
+
+        Returns:
+            np.ndarray: Sorted row indices
+        """
+        rows = self._grid_candidates(min_lon, min_lat, max_lon, max_lat)
+        lat, lon = self.columns["lat"][rows], self.columns["lon"][rows]
+        inside = (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+        return np.sort(rows[inside])
+
+    def nearest(self, lat, lon, n=10, max_km=None):
+        """
+        The n rows closest to a point, nearest first.
+
+        The search box grows until the n-th candidate is provably closer than
+        anything outside it, so only a few cells are scanned for dense data.
+
+        Args:
+            lat, lon (float): Query point
+            n (int): Number of neighbours
+            max_km (float): Optional distance cut-off
+
+        Returns:
+            tuple: (row indices, distances in km)
+
+        Raises:
+            ValueError: If lat or lon is not finite
+        """
+        if not (math.isfinite(lat) and math.isfinite(lon)):
+            raise ValueError("lat and lon must be finite")
+        n = min(n, self.size)
+        if n <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        radius = self.cell
+        while True:
+            rows = self._grid_candidates(lon - radius, lat - radius, lon + radius, lat + radius)
+            # Once the box spans the whole store there is nothing left to grow into.
+            spans_store = (lon - radius <= self.min_lon and lon + radius >= self.max_lon
+                           and lat - radius <= self.min_lat and lat + radius >= self.max_lat)
+            covers_all = spans_store or len(rows) == self.size
+            if len(rows) >= n or covers_all:
+                dist = haversine_km(self.columns["lat"][rows], self.columns["lon"][rows], lat, lon)
+                top = np.argsort(dist, kind="stable")[:n]
+                # Anything outside the box is at least this far away.
+                reach = radius * KM_PER_DEGREE * math.cos(math.radians(min(abs(lat) + radius, 89.9)))
+                if covers_all or dist[top[-1]] <= reach:
+                    rows, dist = rows[top], dist[top]
+                    if max_km is not None:
+                        keep = dist <= max_km
+                        rows, dist = rows[keep], dist[keep]
+                    return rows, dist
+            radius *= 2
+
+    def by_state(self, state):
+        """Rows in a state (case-insensitive)."""
+        return self.state_index.get(state.strip().lower(), np.empty(0, dtype=np.int64))
+
+    def select(self, bbox=None, statuses=None, state=None):
+        """
+        Rows matching every given filter; with no filters, every row.
+
+        Args:
+            bbox (tuple): (min_lon, min_lat, max_lon, max_lat)
+            statuses (list): Allowed statuses
+            state (str): State name
+
+        Returns:
+            np.ndarray: Sorted row indices
+        """
+        rows = self.in_bbox(*bbox) if bbox else np.arange(self.size)
+        if state:
+            rows = np.intersect1d(rows, self.by_state(state), assume_unique=True)
+        if statuses:
+            allowed = [self.status_index.get(s, np.empty(0, dtype=np.int64)) for s in statuses]
+            rows = np.intersect1d(rows, np.concatenate(allowed), assume_unique=True)
+        return rows
+
+    def records(self, rows):
+        """
+        Village dicts for the given rows, in the same order.
+        """
+        cols = self.columns
+        return [
+            {"name": name, "status": status, "lat": float(lat), "lon": float(lon), "state": state}
+            for name, status, lat, lon, state in zip(
+                cols["name"][rows], cols["status"][rows], cols["lat"][rows], cols["lon"][rows], cols["state"][rows])
+        ]
+
+
+def stream_geojson(store, rows, extra=None, chunk_size=500):
+    """
+    Yield a GeoJSON FeatureCollection for the given rows in text chunks, so
+    large answers start flowing before every feature is serialised.
+
+    Args:
+        store (VillageStore): Source store
+        rows (np.ndarray): Row indices to emit
+        extra (dict): Optional {property name: array aligned with rows}
+        chunk_size (int): Features per yielded chunk
+
+    Yields:
+        str: Pieces of the GeoJSON document
+    """
+    yield '{"type": "FeatureCollection", "features": ['
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        features = []
+        for offset, village in enumerate(store.records(chunk)):
+            props = {"name": village["name"], "status": village["status"], "state": village["state"]}
+            if extra:
+                for key, values in extra.items():
+                    props[key] = float(values[start + offset])
+            features.append(json.dumps({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [village["lon"], village["lat"]]},
+                "properties": props,
+            }))
+        yield ("," if start else "") + ",".join(features)
+    yield ']}'
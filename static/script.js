@@ -75,26 +75,6 @@ document.addEventListener('DOMContentLoaded', function () {
 
     let mapData = null; // To store map bounds and village data
 
-    let apiKey = null;
-
-    async function fetchApiKey() {
-        try {
-            const response = await fetch('/get_api_key');
-            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-
-            const data = await response.json();
-            apiKey = data.api_key;
-
-            console.log("Fetched API Key:", apiKey);
-
-        } catch (error) {
-            console.error("Error fetching API key:", error);
-        }
-    }
-
-    fetchApiKey();
-
-
     // Variable to store the last suggested medicines from the AI
     let lastSuggestedMedicines = '';
 
@@ -197,19 +177,11 @@ document.addEventListener('DOMContentLoaded', function () {
         'solar-calc': 0
     };
 
-    function trackAIUsage(aiType) {
-        fetch('/ai-usage-track', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ ai_type: aiType })
-        })
-            .then(res => res.json())
-            .then(data => {
-                updateUsageDisplay(aiType, data.count);
-                // Add visual feedback
-                showUsageUpdate(aiType);
-            })
-            .catch(err => console.error('Usage tracking failed:', err));
+    // Usage is counted by the server as part of each /ai/generate request
+    function trackAIUsage(aiType, count) {
+        updateUsageDisplay(aiType, count);
+        // Add visual feedback
+        showUsageUpdate(aiType);
     }
 
     function updateUsageDisplay(aiType, count) {
@@ -681,10 +653,8 @@ document.addEventListener('DOMContentLoaded', function () {
 3.  **Appointment:** State clearly if a doctor's appointment is necessary.
 AND OUTPUT SHOULD BE IN LANGUAGE USER TYPES
 Use simple language and Markdown for bolding and lists. Do not add any extra conversational text.`
-                , medicalActions
-                
+                , medicalActions, 'ai-doctor'
             ));
-            trackAIUsage('ai-doctor');
         }
 
         if (bookMedicineButton) {
@@ -721,8 +691,8 @@ Use simple language and Markdown for bolding and lists. Do not add any extra con
 3.  **Benefit:** A concise explanation of how it directly benefits the user.
 AND OUTPUT SHOULD BE IN LANGUAGE USER TYPES
 Use simple language and Markdown for bolding and lists. Do not add any extra conversational text.`
+                , null, 'govt-ai'
             ));
-            trackAIUsage('govt-ai');
         }
 
         if (calculateSolarCostButton) {
@@ -750,10 +720,10 @@ Present the output clearly and concisely, using only the requested data points.
                 handleAIRequest(
                     null, // No direct prompt input element, prompt is constructed
                     solarCostResultContainer, solarLoadingIndicator, solarCostResultText,
-                    () => prompt // Pass a function that returns the constructed prompt
+                    () => prompt, // Pass a function that returns the constructed prompt
+                    null, 'solar-calc'
                 );
             });
-            trackAIUsage('solar-calc');
         }
 
         // Problem Reporting Form Listeners
@@ -1152,12 +1122,26 @@ Present the output clearly and concisely, using only the requested data points.
                     // For demonstration, we'll just put coordinates or a generic message
                     villageLocationInput.value = `Lat: ${lat.toFixed(4)}, Lon: ${lon.toFixed(4)}`;
 
-                    // Optional: Call a reverse geocoding API (e.g., OpenStreetMap Nominatim)
+                    // Nearest village we know about, used when the geocoder has no village name
+                    let nearestVillage = null;
                     try {
-                        const response = await fetch(`https://nominatim.openstreetmap.org/reverse?format=json&lat=${lat}&lon=${lon}`);
+                        const nearbyResponse = await fetch(`/villages/nearest?lat=${lat}&lon=${lon}&n=1&max_km=10`);
+                        const nearby = await nearbyResponse.json();
+                        if (nearby.features && nearby.features.length > 0) {
+                            nearestVillage = nearby.features[0].properties;
+                        }
+                    } catch (nearbyError) {
+                        console.warn('Nearest village lookup failed:', nearbyError);
+                    }
+
+                    // Reverse geocode through the server, which caches OpenStreetMap Nominatim answers
+                    try {
+                        const response = await fetch(`/reverse_geocode?lat=${lat}&lon=${lon}`);
                         const data = await response.json();
                         if (data.address && data.address.village) {
                             villageLocationInput.value = data.address.village + (data.address.district ? `, ${data.address.district}` : '') + (data.address.state ? `, ${data.address.state}` : '');
+                        } else if (nearestVillage) {
+                            villageLocationInput.value = `${nearestVillage.name}, ${nearestVillage.state}`;
                         } else if (data.display_name) {
                             villageLocationInput.value = data.display_name;
                         }
@@ -1415,8 +1399,9 @@ Present the output clearly and concisely, using only the requested data points.
      * @param {HTMLElement} responseTextElement - The element to display the AI response.
      * @param {Function} promptGenerator - A function that takes the prompt text and returns the full prompt string for the AI.
      * @param {HTMLElement} [actionButtons=null] - Optional element containing action buttons to show after response.
+     * @param {string} [aiType=null] - Optional usage counter the server bumps for this request.
      */
-    async function handleAIRequest(promptInput, responseContainer, loadingIndicator, responseTextElement, promptGenerator, actionButtons = null) {
+    async function handleAIRequest(promptInput, responseContainer, loadingIndicator, responseTextElement, promptGenerator, actionButtons = null, aiType = null) {
         const promptValue = promptInput ? promptInput.value.trim() : '';
         const prompt = promptGenerator(promptValue);
 
@@ -1433,25 +1418,21 @@ Present the output clearly and concisely, using only the requested data points.
         }
 
         try {
-            let chatHistory = [];
-            chatHistory.push({ role: "user", parts: [{ text: prompt }] });
-
-            const payload = { contents: chatHistory };
-            // Use the global apiKey variable
-            const apiUrl = `https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key=${apiKey}`;
-
-            const response = await fetch(apiUrl, {
+            // The server proxies Gemini, caches repeated questions and counts usage
+            const response = await fetch('/ai/generate', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(payload)
+                body: JSON.stringify({ prompt: prompt, ai_type: aiType })
             });
 
             const result = await response.json();
 
-            if (result.candidates && result.candidates.length > 0 &&
-                result.candidates[0].content && result.candidates[0].content.parts &&
-                result.candidates[0].content.parts.length > 0) {
-                const text = result.candidates[0].content.parts[0].text;
+            if (aiType && result.usage_count !== undefined) {
+                trackAIUsage(aiType, result.usage_count);
+            }
+
+            if (response.ok && result.text) {
+                const text = result.text;
                 responseTextElement.innerHTML = renderMarkdown(text);
 
                 // Extract medicines from the AI response for the AI Doctor tab
@@ -1548,7 +1529,6 @@ Present the output clearly and concisely, using only the requested data points.
         }
 
         try {
-            let chatHistory = [];
             // The prompt needs to instruct the AI on how to use commands.
             const aiPrompt = `You are a helpful assistant for the Digital Bharat website.
 If the user asks about a specific section (e.g., "About Mission", "Our Solution", "Focus Areas", "AI Solutions", "Impact Dashboard", "Get Involved", "Government Schemes", "Contact Us", "Problem Reporting"),
@@ -1559,24 +1539,16 @@ If asked about "Problem Reporting", respond with: [COMMAND:SCROLL_TO:#problem-re
 If you cannot fulfill the request with a command, provide a concise and helpful textual answer.
 User query: ${userMessage}`;
 
-            chatHistory.push({ role: "user", parts: [{ text: aiPrompt }] });
-
-            const payload = { contents: chatHistory };
-            // Use the global apiKey variable
-            const apiUrl = `https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key=${apiKey}`;
-
-            const response = await fetch(apiUrl, {
+            const response = await fetch('/ai/generate', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(payload)
+                body: JSON.stringify({ prompt: aiPrompt })
             });
 
             const result = await response.json();
 
-            if (result.candidates && result.candidates.length > 0 &&
-                result.candidates[0].content && result.candidates[0].content.parts &&
-                result.candidates[0].content.parts.length > 0) {
-                const aiResponse = result.candidates[0].content.parts[0].text;
+            if (response.ok && result.text) {
+                const aiResponse = result.text;
 
                 // Check for a command in the AI response
                 const commandMatch = aiResponse.match(/\[COMMAND:([^\]]+)\]/);
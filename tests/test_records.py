@@ -0,0 +1,164 @@
+"""Round trips through helpers.records, including values the typed columns cannot hold."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.records import COMPACT_MIN_GARBAGE, TaskRecords, pack, unpack, parse_time  # noqa: E402
+
+
+def round_trip(tasks):
+    return TaskRecords(tasks).to_list()
+
+
+class RoundTripTest(unittest.TestCase):
+
+    def assertRoundTrips(self, tasks):
+        result = round_trip(tasks)
+        self.assertEqual(result, tasks)
+        # Equal dicts may still differ in key order, which json.dump keeps.
+        self.assertEqual([list(task) for task in result], [list(task) for task in tasks])
+
+    def test_plain_tasks(self):
+        self.assertRoundTrips([
+            {"name": "Food Kit", "email": "a@example.com", "time": "09:15:00",
+             "time_log": ["09:15:00", "17:45:30"], "no_of_responses": 3},
+            {"name": "Blankets", "time": "23:59:59", "time_log": [], "no_of_responses": 0},
+        ])
+
+    def test_sparse_typed_columns(self):
+        self.assertRoundTrips([
+            {"name": "a"},
+            {"name": "b", "time": "10:00:00", "time_log": ["10:00:00"], "no_of_responses": 2},
+            {"time_log": ["7:05"]},
+            {"name": "c"},
+        ])
+
+    def test_key_order_and_missing_fields(self):
+        self.assertRoundTrips([
+            {"b": "1", "a": "2"},
+            {"a": "3", "b": "4"},
+            {"c": "5"},
+            {},
+        ])
+
+    def test_overflow_values(self):
+        self.assertRoundTrips([
+            {"name": 42, "note": None, "tags": ["x", {"y": 1}], "nested": {"k": "v"}},
+            {"name": 1.5, "note": True},
+            {"no_of_responses": 2 ** 63},
+            {"no_of_responses": -2 ** 63 - 1},
+            {"no_of_responses": 2 ** 63 - 1},
+            {"no_of_responses": 2.0},
+            {"no_of_responses": "7"},
+            {"no_of_responses": None},
+        ])
+
+    def test_bool_counts_stay_bools(self):
+        result = round_trip([{"no_of_responses": True}, {"no_of_responses": False}])
+        self.assertIs(result[0]["no_of_responses"], True)
+        self.assertIs(result[1]["no_of_responses"], False)
+
+    def test_lone_surrogates(self):
+        self.assertRoundTrips([
+            {"name": "\ud800", "message": "ok \udfff end"},
+            {"name": "café \U0001f600", "message": ""},
+        ])
+
+    def test_time_fields_that_are_not_hh_mm_ss(self):
+        self.assertRoundTrips([
+            {"time": "7:05", "time_log": ["7:05:00"]},
+            {"time": "24:00:00", "time_log": ["09:00:00", "25:00:00"]},
+            {"time": "09:00:00 ", "time_log": ["09:00"]},
+            {"time": None, "time_log": None},
+            {"time": 3600, "time_log": "09:00:00"},
+            {"time": "09:00:00", "time_log": [32400]},
+            {"time": "０９:00:00", "time_log": ["０９:00:00"]},
+            {"time": "1\u0669:00:00", "time_log": ["00:1\u0665:00"]},
+        ])
+
+    def test_parse_time_only_accepts_exact_strings(self):
+        self.assertEqual(parse_time("00:00:00"), 0)
+        self.assertEqual(parse_time("23:59:59"), 86399)
+        for value in ("7:05:00", "24:00:00", "12:60:00", "12:00", "12:00:00\n", "1\u0669:00:00", 43200, None):
+            self.assertIsNone(parse_time(value), value)
+
+
+class SetTest(unittest.TestCase):
+
+    def test_set_moves_between_column_and_overflow(self):
+        records = TaskRecords([{"name": "a", "time": "09:00:00", "no_of_responses": 1}])
+        for field, values in {"name": ["longer name", 7, "\ud800", "a"],
+                              "time": ["7:05", "10:00:00"],
+                              "no_of_responses": [True, 2 ** 70, 5]}.items():
+            for value in values:
+                records.set(0, field, value)
+                self.assertEqual(records.get(0, field), value)
+                self.assertIs(type(records.get(0, field)), type(value))
+        self.assertEqual(records.row(0), {"name": "a", "time": "10:00:00", "no_of_responses": 5})
+
+    def test_new_field_goes_last(self):
+        records = TaskRecords([{"b": "1", "a": "2"}, {"a": "3"}])
+        records.set(1, "b", "4")
+        self.assertEqual(list(records.row(0)), ["b", "a"])
+        self.assertEqual(list(records.row(1)), ["a", "b"])
+        self.assertIsNone(records.get(0, "missing"))
+
+    def test_find_skips_padded_typed_rows(self):
+        records = TaskRecords([{"name": "a"}, {"name": "b", "time_log": ["10:00:00"], "time": "10:00:00"},
+                               {"name": "c", "no_of_responses": 0}])
+        self.assertEqual(records.find("time_log", ["10:00:00"]), 1)
+        self.assertEqual(records.find("time", "10:00:00"), 1)
+        self.assertEqual(records.find("no_of_responses", 0), 2)
+        self.assertIsNone(records.find("time_log", []))
+
+    def test_find_ignores_rows_without_the_field(self):
+        records = TaskRecords([{"other": "x"}, {"name": ""}, {"name": "Food Kit"}])
+        self.assertEqual(records.find("name", ""), 1)
+        self.assertEqual(records.find("name", "Food Kit"), 2)
+        self.assertIsNone(records.find("name", "nope"))
+        self.assertEqual(records.find("name", "Food Kit"), records.find("name", "Food Kit"))
+
+    def test_overwrites_compact_the_string_buffer(self):
+        records = TaskRecords([{"name": "x" * 1000}, {"name": "keep"}])
+        for i in range(200):
+            records.set(0, "name", str(i) * 1000)
+        column = records._columns["name"]
+        self.assertLess(len(column.data), 2 * COMPACT_MIN_GARBAGE + 3000)
+        self.assertEqual(records.to_list(), [{"name": "199" * 1000}, {"name": "keep"}])
+
+    def test_negative_rows_and_bounds(self):
+        records = TaskRecords([{"name": "a"}, {"name": "b"}])
+        self.assertEqual(records.get(-1, "name"), "b")
+        with self.assertRaises(IndexError):
+            records.get(2, "name")
+        with self.assertRaises(TypeError):
+            records.append(["not", "a", "dict"])
+
+
+class PackTest(unittest.TestCase):
+
+    def test_documents_round_trip(self):
+        document = {
+            "Contacts": [{"name": "a", "time": "10:00:00"}],
+            "Donations Made": {
+                "2024-05-01": [{"name": "Food Kit", "no_of_responses": 2}],
+                "2024-05-02": [],
+                "notes": "not a task list",
+            },
+            "Empty": [],
+            "Mixed": [{"name": "a"}, "not a dict"],
+            "count": 3,
+        }
+        packed = pack(document)
+        self.assertIsInstance(packed["Contacts"], TaskRecords)
+        self.assertIsInstance(packed["Donations Made"]["2024-05-01"], TaskRecords)
+        self.assertEqual(packed["Mixed"], document["Mixed"])
+        self.assertEqual(unpack(packed), document)
+        self.assertEqual(list(unpack(packed)), list(document))
+
+
+if __name__ == "__main__":
+    unittest.main()
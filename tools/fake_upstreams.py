@@ -0,0 +1,178 @@
+"""
+Fake Upstream Services
+======================
+
+Local stand-ins for the external APIs the app calls, for tests and local
+runs without network access or API keys.
+
+Gemini:
+- POST /v1beta/models/<model>:generateContent
+- POST /v1beta/models/<model>:streamGenerateContent?alt=sse
+
+Nominatim:
+- GET /reverse?lat=&lon=&format=json
+
+geoBoundaries:
+- GET /api/current/gbOpen/IND/ADM1/ (metadata pointing at the file below)
+- GET /geoboundaries/IND_ADM1.geojson: a GRID x GRID grid of rectangular
+  "states" over India's bounding box
+
+Usage:
+    python tools/fake_upstreams.py --port 8089
+    DATA_DIR=/tmp/digital-bharat-fake \
+    GEMINI_API_KEY=fake GEMINI_API_BASE=http://127.0.0.1:8089/v1beta \
+    NOMINATIM_URL=http://127.0.0.1:8089/reverse \
+    GEOBOUNDARIES_API_URL=http://127.0.0.1:8089/api/current/gbOpen/IND/ADM1/ \
+    python app.py
+"""
+
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+# Same box as app.INDIA_BOUNDS.
+INDIA_BOUNDS = (68.1766451354, 7.96553477623, 97.4025614766, 35.4940095078)
+GRID = 6
+
+
+def fake_states(grid=GRID):
+    """A FeatureCollection of grid x grid rectangles named "Zone <row>-<col>"."""
+    min_lon, min_lat, max_lon, max_lat = INDIA_BOUNDS
+    width, height = (max_lon - min_lon) / grid, (max_lat - min_lat) / grid
+    features = []
+    for row in range(grid):
+        for col in range(grid):
+            x0, y0 = min_lon + col * width, min_lat + row * height
+            ring = [[x0, y0], [x0 + width, y0], [x0 + width, y0 + height], [x0, y0 + height], [x0, y0]]
+            features.append({
+                "type": "Feature",
+                "properties": {"shapeName": f"Zone {row}-{col}", "shapeISO": f"IN-Z{row}{col}"},
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+            })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def zone_at(lat, lon, grid=GRID):
+    """Name of the fake_states rectangle containing (lat, lon), or None."""
+    min_lon, min_lat, max_lon, max_lat = INDIA_BOUNDS
+    if not (min_lon <= lon < max_lon and min_lat <= lat < max_lat):
+        return None
+    row = int((lat - min_lat) / (max_lat - min_lat) * grid)
+    col = int((lon - min_lon) / (max_lon - min_lon) * grid)
+    return f"Zone {row}-{col}"
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    # Seconds to wait before answering, to mimic upstream latency.
+    delay = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/reverse":
+            return self._nominatim(parse_qs(url.query))
+        if url.path.rstrip("/") == "/api/current/gbOpen/IND/ADM1":
+            time.sleep(self.delay)
+            host = self.headers.get("Host", f"127.0.0.1:{self.server.server_port}")
+            return self._send_json(200, {
+                "boundaryISO": "IND",
+                "boundaryType": "ADM1",
+                "gjDownloadURL": f"http://{host}/geoboundaries/IND_ADM1.geojson",
+            })
+        if url.path == "/geoboundaries/IND_ADM1.geojson":
+            time.sleep(self.delay)
+            return self._send_json(200, fake_states())
+        self._send_json(404, {"error": "not found"})
+
+    def _nominatim(self, query):
+        try:
+            lat, lon = float(query["lat"][0]), float(query["lon"][0])
+        except (KeyError, ValueError):
+            return self._send_json(400, {"error": "lat and lon are required"})
+        time.sleep(self.delay)
+        zone = zone_at(lat, lon)
+        if zone is None:
+            return self._send_json(200, {"error": "Unable to geocode"})
+        self._send_json(200, {
+            "display_name": f"{lat:.4f}, {lon:.4f}, {zone}, India",
+            "address": {"state": zone, "country": "India", "country_code": "in"},
+        })
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if ":generateContent" in path or ":streamGenerateContent" in path:
+            return self._gemini(path)
+        self._send_json(404, {"error": "not found"})
+
+    def _gemini(self, path):
+        payload = self._read_json()
+        try:
+            prompt = payload["contents"][-1]["parts"][0]["text"]
+        except (KeyError, IndexError):
+            return self._send_json(400, {"error": {"message": "missing contents"}})
+        time.sleep(self.delay)
+        answer = f"**Stub answer** for: {prompt[:80]}"
+
+        if ":streamGenerateContent" not in path:
+            return self._send_json(200, {"candidates": [{"content": {"role": "model", "parts": [{"text": answer}]}}]})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for word in answer.split(" "):
+            chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": word + " "}]}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode("utf-8"))
+            self.wfile.flush()
+        self.close_connection = True
+
+
+def start(port=0, delay=0.0):
+    """
+    Run the fake upstreams on a background thread.
+
+    Args:
+        port (int): Port to bind on 127.0.0.1 (0 picks a free one)
+        delay (float): Seconds each response waits before answering
+
+    Returns:
+        ThreadingHTTPServer: Call .shutdown() to stop; .server_port is the port
+    """
+    handler = type("Handler", (FakeUpstreamHandler,), {"delay": delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds of simulated upstream latency")
+    args = parser.parse_args()
+
+    server = start(args.port, args.delay)
+    print(f"Fake upstreams listening on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,392 @@
+"""
+Load Test
+=========
+
+Replays a weighted mix of requests against the app, then reports
+throughput, latency percentiles per request kind and any accepted writes
+missing from the app's JSON stores.
+
+Usage:
+    python tools/loadtest.py --serve gunicorn --duration 30 --concurrency 32
+    python tools/loadtest.py --serve uvicorn --requests 5000 --mix "/tab-click=3,forms=1"
+    python tools/loadtest.py --url http://127.0.0.1:5000 --duration 60
+
+--serve starts tools/fake_upstreams.py in this process and the app (uvicorn
+or gunicorn on --port) with its Gemini, Nominatim and geoBoundaries URLs
+pointed at the fakes and its DATA_DIR at --data-dir, or at a temporary
+directory removed afterwards, and stops it at the end. --url uses a server
+that is already running on this machine; the store check reads its files
+from --data-dir (default: $DATA_DIR, else /tmp).
+
+Request kinds for --mix (kind=weight, comma-separated):
+    /                 the page
+    /tab-click        POST, tab ids unique to this run
+    /ai-usage-track   POST, ai types unique to this run
+    /user-stats       GET
+    forms             POST to the six form routes in turn, tagged with the run id
+    /generate_map     GET at a few widths (so some renders are cold)
+    /ai/generate      POST, answered by the fake Gemini (off by default)
+    /reverse_geocode  GET, answered by the fake Nominatim (off by default)
+
+Lost writes: every 2xx tracking request must show up in the click or AI
+usage counters and its client IP (sent as X-Forwarded-For) in the user
+store, and every 2xx form submission as a stored task with this run's id.
+Form writes are queued, so the check waits up to --settle seconds for them.
+Requests that failed may or may not have been written and are not counted.
+The run's records stay in the stores, named after the run id, so with --url
+point the app at a scratch DATA_DIR rather than at data worth keeping.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_upstreams  # noqa: E402
+
+
+DEFAULT_MIX = "/=5,/tab-click=40,/ai-usage-track=15,/user-stats=20,forms=15,/generate_map=5"
+KINDS = ("/", "/tab-click", "/ai-usage-track", "/user-stats", "forms", "/generate_map",
+         "/ai/generate", "/reverse_geocode")
+TABS = 8
+MAP_WIDTHS = (600, 800, 1000, 1200)
+SERVER_START_TIMEOUT = 90
+REQUEST_TIMEOUT = 60
+
+
+def parse_mix(text):
+    """
+    "kind=weight,..." as {kind: weight}.
+
+    Raises:
+        ValueError: For an unknown kind or a bad weight
+    """
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        kind, _, weight = part.rpartition("=")
+        if kind not in KINDS:
+            raise ValueError(f"Unknown request kind {kind!r}; choose from {', '.join(KINDS)}")
+        mix[kind] = float(weight)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("The mix needs at least one positive weight")
+    return mix
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+def start_server(kind, port, fake_base, data_dir):
+    """
+    Start the app under uvicorn or gunicorn with the upstreams pointed at
+    fake_base and its files under data_dir.
+
+    Returns:
+        tuple: (Popen, log file path)
+    """
+    env = dict(os.environ,
+               DATA_DIR=data_dir,
+               GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "fake"),
+               GEMINI_API_BASE=f"{fake_base}/v1beta",
+               NOMINATIM_URL=f"{fake_base}/reverse",
+               GEOBOUNDARIES_API_URL=f"{fake_base}/api/current/gbOpen/IND/ADM1/")
+    if kind == "uvicorn":
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:application", "--host", "127.0.0.1",
+               "--port", str(port), "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+        env["BIND"] = f"127.0.0.1:{port}"
+    log = tempfile.NamedTemporaryFile(prefix=f"loadtest-{kind}-", suffix=".log", delete=False)
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT), log.name
+
+
+def wait_healthy(url, process=None):
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            if requests.get(f"{url}/health", timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not become healthy in {SERVER_START_TIMEOUT}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+# ============================================================================
+# LOAD
+# ============================================================================
+
+class LoadRun:
+    """Request generator and bookkeeping for one run."""
+
+    def __init__(self, url, mix, run_id, users, forms, seed=None):
+        self.url = url
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.run_id = run_id
+        self.ips = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(1, users + 1)]
+        self.forms = sorted(forms)
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self.latencies = {}       # kind -> [seconds]
+        self.statuses = {}        # kind -> Counter of status codes (0: no response)
+        self.accepted = Counter()  # tab id / ai type / form route -> 2xx responses
+        self.accepted_ips = set()
+
+    def _next(self):
+        with self._lock:
+            self._sequence += 1
+            return self._sequence
+
+    def _request(self, rng):
+        """(kind, method, path, json body, accepted key) for the next request."""
+        kind = rng.choices(self.kinds, self.weights)[0]
+        seq = self._next()
+        if kind == "/tab-click":
+            tab = f"loadtest-{self.run_id}-tab{seq % TABS}"
+            return kind, "POST", kind, {"tab_id": tab}, ("tab", tab)
+        if kind == "/ai-usage-track":
+            ai_type = f"loadtest-{self.run_id}-ai{seq % TABS}"
+            return kind, "POST", kind, {"ai_type": ai_type}, ("ai", ai_type)
+        if kind == "forms":
+            route = self.forms[seq % len(self.forms)]
+            # add_task treats same-named submissions on a day as one task.
+            body = {"name": f"Load Test {self.run_id}-{seq}", "email": "loadtest@example.com", "message": "load test",
+                    "loadtest": self.run_id, "seq": seq}
+            return kind, "POST", route, body, ("form", route)
+        if kind == "/generate_map":
+            return kind, "GET", f"/generate_map?width={MAP_WIDTHS[seq % len(MAP_WIDTHS)]}", None, None
+        if kind == "/ai/generate":
+            return kind, "POST", kind, {"prompt": f"load test question {seq % 50}"}, None
+        if kind == "/reverse_geocode":
+            lat, lon = rng.uniform(8.5, 34.5), rng.uniform(69, 97)
+            return kind, "GET", f"/reverse_geocode?lat={lat:.4f}&lon={lon:.4f}", None, None
+        return kind, "GET", kind, None, None
+
+    def worker(self, index, stop_at, remaining):
+        rng = random.Random(None if self.seed is None else self.seed + index)
+        session = requests.Session()
+        latencies, statuses, accepted, ips = {}, {}, Counter(), set()
+        while time.monotonic() < stop_at:
+            if remaining is not None:
+                with self._lock:
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+            kind, method, path, body, key = self._request(rng)
+            ip = rng.choice(self.ips)
+            start = time.perf_counter()
+            try:
+                resp = session.request(method, self.url + path, json=body, timeout=REQUEST_TIMEOUT,
+                                       headers={"X-Forwarded-For": ip})
+                status = resp.status_code
+            except requests.RequestException:
+                status = 0
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+            statuses.setdefault(kind, Counter())[status] += 1
+            if key is not None and 200 <= status < 300:
+                accepted[key] += 1
+                if key[0] in ("tab", "ai"):
+                    ips.add(ip)
+
+        with self._lock:
+            for kind, values in latencies.items():
+                self.latencies.setdefault(kind, []).extend(values)
+                self.statuses.setdefault(kind, Counter()).update(statuses[kind])
+            self.accepted.update(accepted)
+            self.accepted_ips |= ips
+
+    def run(self, concurrency, duration=None, total=None):
+        """Run until `duration` seconds pass or `total` requests are sent; returns elapsed seconds."""
+        stop_at = time.monotonic() + (duration if duration else float("inf"))
+        remaining = [total] if total else None
+        threads = [threading.Thread(target=self.worker, args=(i, stop_at, remaining), daemon=True)
+                   for i in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+
+# ============================================================================
+# STORE CHECK
+# ============================================================================
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _count_tagged(node, run_id):
+    """Tasks anywhere under node tagged {"loadtest": run_id}."""
+    if isinstance(node, dict):
+        if node.get("loadtest") == run_id:
+            return 1
+        return sum(_count_tagged(value, run_id) for value in node.values())
+    if isinstance(node, list):
+        return sum(_count_tagged(value, run_id) for value in node)
+    return 0
+
+
+def stored_writes(run, site):
+    """{key: stored count} for every key the run had accepted, plus the stored user IPs."""
+    clicks, usage = _load(site.CLICK_FILE), _load(site.AI_USAGE_FILE)
+    form_files = {route: site.FORMS[route]["args"][0] for route in run.forms}
+    form_counts = {route: _count_tagged(_load(path), run.run_id) for route, path in form_files.items()}
+    counts = {"tab": clicks, "ai": usage, "form": form_counts}
+    stored = {(source, name): counts[source].get(name, 0) for source, name in run.accepted}
+    ips = {user.get("ip") for user in _load(site.USER_FILE).get("users", [])}
+    return stored, ips
+
+
+def check_writes(run, site, settle):
+    """
+    Compare the stores with what the run had accepted, waiting up to
+    `settle` seconds for queued form writes to land.
+
+    Returns:
+        tuple: ({key: (accepted, stored)}, IPs missing from the user store)
+    """
+    deadline = time.monotonic() + settle
+    while True:
+        stored, ips = stored_writes(run, site)
+        missing_ips = run.accepted_ips - ips
+        short = [key for key, count in run.accepted.items() if stored[key] < count]
+        if (not short and not missing_ips) or time.monotonic() >= deadline:
+            return {key: (count, stored[key]) for key, count in run.accepted.items()}, missing_ips
+        time.sleep(0.5)
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def report(run, elapsed, writes, missing_ips):
+    """Print the results; returns the number of lost writes."""
+    total = sum(len(values) for values in run.latencies.values())
+    print(f"\n{total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s\n")
+    print(f"{'kind':<18}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  statuses")
+    for kind in KINDS:
+        values = sorted(run.latencies.get(kind, []))
+        if not values:
+            continue
+        statuses = run.statuses[kind]
+        errors = sum(n for status, n in statuses.items() if status == 0 or status >= 500)
+        codes = " ".join(f"{status or 'failed'}:{n}" for status, n in sorted(statuses.items()))
+        print(f"{kind:<18}{len(values):>8}{errors:>8}"
+              f"{percentile(values, 0.50) * 1000:>10.1f}{percentile(values, 0.95) * 1000:>10.1f}"
+              f"{percentile(values, 0.99) * 1000:>10.1f}{values[-1] * 1000:>10.1f}  {codes}")
+
+    lost = 0
+    print("\nWrites (accepted -> stored):")
+    for (source, name), (accepted, stored) in sorted(writes.items()):
+        missing = max(0, accepted - stored)
+        lost += missing
+        print(f"  {source:<5} {name:<40} {accepted:>7} -> {stored:<7}{'  LOST ' + str(missing) if missing else ''}")
+    print(f"  users: {len(run.accepted_ips)} IPs tracked, {len(missing_ips)} missing from the user store")
+    lost += len(missing_ips)
+    print(f"\nLost writes: {lost}")
+    return lost
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://127.0.0.1:5000", help="server to test (default %(default)s)")
+    target.add_argument("--serve", choices=("uvicorn", "gunicorn"), help="start the app with fake upstreams")
+    parser.add_argument("--port", type=int, default=5055, help="port for --serve (default %(default)s)")
+    parser.add_argument("--data-dir", default=None,
+                        help="the server's DATA_DIR (default: a temporary directory with --serve, "
+                             "else $DATA_DIR or /tmp)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="request kinds and weights (default %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=16, help="client threads (default %(default)s)")
+    parser.add_argument("--duration", type=float, default=None, help="seconds to run (default 30 without --requests)")
+    parser.add_argument("--requests", type=int, default=None, help="total requests to send")
+    parser.add_argument("--users", type=int, default=1000, help="distinct client IPs (default %(default)s)")
+    parser.add_argument("--settle", type=float, default=15, help="seconds to wait for queued writes (default %(default)s)")
+    parser.add_argument("--upstream-delay", type=float, default=0.0, help="latency of the fake upstreams in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for a repeatable mix")
+    args = parser.parse_args(argv)
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.duration is None and args.requests is None:
+        args.duration = 30
+
+    scratch = None
+    if args.data_dir is None and args.serve:
+        args.data_dir = scratch = tempfile.mkdtemp(prefix="loadtest-data-")
+    if args.data_dir is not None:
+        os.environ["DATA_DIR"] = os.path.abspath(args.data_dir)
+    # Imported for the store paths, which follow DATA_DIR.
+    import app as site
+
+    process = upstreams = None
+    url = args.url.rstrip("/")
+    try:
+        if args.serve:
+            upstreams = fake_upstreams.start(delay=args.upstream_delay)
+            url = f"http://127.0.0.1:{args.port}"
+            process, log_path = start_server(args.serve, args.port, f"http://127.0.0.1:{upstreams.server_port}",
+                                             site.DATA_DIR)
+            print(f"Starting {args.serve} on {url} (log: {log_path}, data: {site.DATA_DIR})", flush=True)
+        wait_healthy(url, process)
+
+        run = LoadRun(url, mix, run_id=f"{int(time.time())}-{os.getpid()}", users=args.users,
+                      forms=site.FORMS, seed=args.seed)
+        limit = f"{args.duration:g}s" if args.duration else f"{args.requests} requests"
+        print(f"Run {run.run_id}: {limit}, {args.concurrency} clients, mix {args.mix}", flush=True)
+        elapsed = run.run(args.concurrency, args.duration, args.requests)
+        writes, missing_ips = check_writes(run, site, args.settle)
+    finally:
+        if process is not None:
+            stop_server(process)
+        if upstreams is not None:
+            upstreams.shutdown()
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    return 1 if report(run, elapsed, writes, missing_ips) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())